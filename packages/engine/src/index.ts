@@ -2,10 +2,33 @@
 export * from './types';
 
 // ── Parser ─────────────────────────────────────────────────────────
-export { parseBNGLWithANTLR, parseBNGLStrict } from './parser/BNGLParserWrapper';
+export { parseBNGLWithANTLR, parseBNGLStrict, clearParseTreeCache } from './parser/BNGLParserWrapper';
 export type { ParseResult, ParseError } from './parser/BNGLParserWrapper';
 export { BNGLVisitor } from './parser/BNGLVisitor';
-export { getExpressionDependencies } from './parser/ExpressionDependencies';
+export { getExpressionDependencies, clearExpressionDependencyCache } from './parser/ExpressionDependencies';
+export {
+  clearDFACache,
+  trimDFACache,
+  getDFACacheSize,
+  setDFATrimThreshold,
+  setMemoizedRules,
+  isRuleMemoized,
+  parseStreaming,
+  visitStreaming,
+  clearInternedNames,
+} from './parser/SharedParser';
+export type { MemoizableRule } from './parser/SharedParser';
+export {
+  BNGLTreeWalker,
+  RuleDispatchListener,
+  PhasedRuleListener,
+  RulePhase,
+  defineListener,
+  walkParseTree,
+  walkMany,
+  asParseListener,
+} from './parser/BNGLTreeWalker';
+export { BNGLParseTreeVisitor } from './parser/BNGLParseTreeVisitor';
 
 // ── Graph Services ─────────────────────────────────────────────────
 // Core data structures
@@ -25,6 +48,17 @@ export { NautyService } from './services/graph/core/NautyService';
 export { EnergyService } from './services/graph/core/EnergyService';
 export { ExpressionTranslator } from './services/graph/core/ExpressionTranslator';
 export { countEmbeddingDegeneracy } from './services/graph/core/degeneracy';
+export {
+  MoleculePatternBatch,
+  NO_STATE,
+  STATE_ANY,
+  BOND_FREE,
+  BOND_BOUND,
+  BOND_EITHER,
+  NO_COMPARTMENT,
+  NO_TAG,
+  NO_WILDCARD,
+} from './services/graph/core/MoleculePatternBatch';
 
 // High-level graph algorithms
 export { NetworkGenerator } from './services/graph/NetworkGenerator';
@@ -38,6 +72,7 @@ export type { FeatureFlags } from './featureFlags';
 export { generateExpandedNetwork } from './services/simulation/NetworkExpansion';
 export { simulate } from './services/simulation/SimulationLoop';
 export { evaluateFunctionalRate, evaluateExpressionOrParse, loadEvaluator, clearAllEvaluatorCaches, containsRateLawMacro, expandRateLawMacros, getCacheSizes, _setEvaluatorRefForTests } from './services/simulation/ExpressionEvaluator';
+export { ExpressionBatch, BatchOp } from './services/simulation/ExpressionBatch';
 export { requiresCompartmentResolution, resolveCompartmentVolumes } from './services/simulation/CompartmentResolver';
 export { BNGXMLWriter } from './services/simulation/BNGXMLWriter';
 export { parseGdat } from './services/simulation/GdatParser';
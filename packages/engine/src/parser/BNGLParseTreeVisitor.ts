@@ -0,0 +1,388 @@
+/**
+ * Rule-indexed visitor base for BNGParser parse trees.
+ *
+ * ANTLR's AbstractParseTreeVisitor.visit() goes through ctx.accept(), which
+ * probes the visitor for the matching visitXxx method on every node.
+ * BNGLParseTreeVisitor resolves those methods once per visitor class into an
+ * array indexed by rule, and unwraps the single-child links of the expression
+ * ladder (expression -> conditional_expr -> ... -> primary_expr) in a loop
+ * instead of one visitChildren or handler round trip per level.
+ */
+import { AbstractParseTreeVisitor } from 'antlr4ts/tree/AbstractParseTreeVisitor.js';
+import type { ParseTree } from 'antlr4ts/tree/ParseTree.js';
+import type { RuleNode } from 'antlr4ts/tree/RuleNode.js';
+import type { ParseTreeListener } from 'antlr4ts/tree/ParseTreeListener.js';
+import type { Parser } from 'antlr4ts/Parser.js';
+import { ParserRuleContext } from 'antlr4ts/ParserRuleContext.js';
+import { BNGParser } from './generated/BNGParser.ts';
+import type { BNGParserVisitor } from './generated/BNGParserVisitor.ts';
+
+type VisitHandler = (ctx: ParserRuleContext) => unknown;
+
+interface VisitTable {
+  handlers: Array<VisitHandler | undefined>;
+  // Whether aggregateResult/shouldVisitNextChild are ANTLR's defaults, so the
+  // result of visitChildren is simply that of the last child.
+  defaultAggregation: boolean;
+  // Whether visitChildren is also the default, which makes visiting a
+  // single-child node the same as visiting its child.
+  canUnwrap: boolean;
+  // Whether the class declares transparentChains, so single-child ladder
+  // levels can be skipped even where it has a handler.
+  transparentChains: boolean;
+  // Whether visitTerminal/visitErrorNode are ANTLR's defaults, which only
+  // return defaultResult(), so token children need not be visited.
+  ignoresTokens: boolean;
+}
+
+// visitXxx method names by rule index, built once at load.
+const VISIT_NAMES: readonly string[] = BNGParser.ruleNames.map(
+  (name) => 'visit' + name.charAt(0).toUpperCase() + name.slice(1)
+);
+const VISIT_NAME_SET = new Set(VISIT_NAMES);
+
+// Rules of the expression ladder that are plain wrappers when they have a
+// single child: the operator levels expression through unary_expr, and
+// primary_expr, whose single child is an operand (literal, name, call) that
+// handlers commonly read in place.
+const LADDER_LEVEL = 1;
+const LADDER_OPERAND = 2;
+const PASS_THROUGH_RULES = new Uint8Array(BNGParser.ruleNames.length);
+for (let i = BNGParser.RULE_expression; i < BNGParser.RULE_primary_expr; i++) {
+  PASS_THROUGH_RULES[i] = LADDER_LEVEL;
+}
+PASS_THROUGH_RULES[BNGParser.RULE_primary_expr] = LADDER_OPERAND;
+
+// Visitor (or visitor prototype) -> resolved handlers.
+const visitTables = new WeakMap<object, VisitTable>();
+
+const base = AbstractParseTreeVisitor.prototype as unknown as Record<string, unknown>;
+
+function hasOwnHandlers(visitor: object): boolean {
+  for (const key of Object.getOwnPropertyNames(visitor)) {
+    if (VISIT_NAME_SET.has(key)) return true;
+  }
+  return false;
+}
+
+function resolveVisitTable(visitor: AbstractParseTreeVisitor<unknown>): VisitTable {
+  // Handlers defined as methods are the same for every instance of a class,
+  // so the table is kept on the prototype.
+  const owner: object = hasOwnHandlers(visitor) ? visitor : Object.getPrototypeOf(visitor);
+  let table = visitTables.get(owner);
+  if (!table) {
+    const methods = visitor as unknown as Record<string, unknown>;
+    const handlers = new Array<VisitHandler | undefined>(VISIT_NAMES.length);
+    for (let i = 0; i < VISIT_NAMES.length; i++) {
+      const handler = methods[VISIT_NAMES[i]];
+      if (typeof handler === 'function') handlers[i] = handler as VisitHandler;
+    }
+    const defaultAggregation =
+      methods.aggregateResult === base.aggregateResult &&
+      methods.shouldVisitNextChild === base.shouldVisitNextChild;
+    const canUnwrap =
+      defaultAggregation && methods.visitChildren === BNGLParseTreeVisitor.prototype.visitChildren;
+    const transparentChains =
+      (visitor.constructor as { transparentChains?: boolean }).transparentChains === true;
+    const ignoresTokens =
+      methods.visitTerminal === base.visitTerminal && methods.visitErrorNode === base.visitErrorNode;
+    table = { handlers, defaultAggregation, canUnwrap, transparentChains, ignoresTokens };
+    visitTables.set(owner, table);
+  }
+  return table;
+}
+
+// Handled contexts of a tree in post-order, with the handler for each.
+interface PostOrderPlan {
+  nodes: ParserRuleContext[];
+  handlers: VisitHandler[];
+}
+
+// Root context -> visit table -> plan, for visitPostOrder(tree, { reuse }).
+const postOrderPlans = new WeakMap<ParserRuleContext, WeakMap<VisitTable, PostOrderPlan>>();
+
+function planPostOrder(root: ParserRuleContext, table: ReadonlyArray<VisitHandler | undefined>): PostOrderPlan {
+  const plan: PostOrderPlan = { nodes: [], handlers: [] };
+  const stack: ParserRuleContext[] = [root];
+  const nextChild: number[] = [0];
+  while (stack.length > 0) {
+    const top = stack.length - 1;
+    const ctx = stack[top];
+    const children = ctx.children;
+    const i = nextChild[top];
+    if (children !== undefined && i < children.length) {
+      nextChild[top] = i + 1;
+      const child = children[i];
+      if (child instanceof ParserRuleContext) {
+        stack.push(child);
+        nextChild.push(0);
+      }
+      continue;
+    }
+    stack.pop();
+    nextChild.pop();
+    const handler = table[ctx.ruleIndex];
+    if (handler !== undefined) {
+      plan.nodes.push(ctx);
+      plan.handlers.push(handler);
+    }
+  }
+  return plan;
+}
+
+/**
+ * AbstractParseTreeVisitor that dispatches visit() by rule index.
+ *
+ * visitChildren() sends child rules back through the same table rather than
+ * through each child's accept(), so an unhandled rule costs one array load
+ * instead of a visitXxx probe and an extra call.
+ *
+ * Subclasses define visitXxx methods exactly as for a BNGParserVisitor. When a
+ * context on the expression ladder has a single child rule and the subclass
+ * has no handler for it, visit() moves straight to the child. This is
+ * skipped if the subclass overrides visitChildren, aggregateResult or
+ * shouldVisitNextChild, since those could observe the intermediate levels.
+ *
+ * Evaluators usually handle every operator level, with handlers that just
+ * return their child's result when there is no operator. Such a subclass can
+ * declare `static transparentChains = true` to have single-child contexts
+ * from expression through unary_expr skipped even though it handles them,
+ * so a bare literal costs one handler call instead of ten.
+ */
+export abstract class BNGLParseTreeVisitor<Result>
+  extends AbstractParseTreeVisitor<Result>
+  implements BNGParserVisitor<Result>
+{
+  // Rules whose handler results are memoized, and the results of the current
+  // top-level visit keyed by context. Every instance gets the same fields up
+  // front so all visitors share one object layout; the WeakMaps here and below
+  // are only allocated once a visitor uses them.
+  private memoRules: Uint8Array | undefined = undefined;
+  private memo: WeakMap<ParserRuleContext, Result> | undefined = undefined;
+  private visitDepth = 0;
+  // Source text of contexts read through textOf().
+  private textCache: WeakMap<ParserRuleContext, string> | undefined = undefined;
+  // This visitor's resolved handler table, so dispatch does not go back to
+  // the shared WeakMap for every node.
+  private visitTable: VisitTable | undefined = undefined;
+
+  private handlerTable(): VisitTable {
+    return this.visitTable ?? (this.visitTable = resolveVisitTable(this));
+  }
+
+  /**
+   * Memoize the visitXxx results of the given rules by context identity, so a
+   * subtree reached more than once in one traversal is only evaluated once.
+   * Only for handlers whose result depends on nothing but their subtree.
+   * Results are dropped at the start of every top-level visit() call; calling
+   * a visitXxx method directly bypasses the cache.
+   *
+   * No visitor in this package calls it: each one reaches every context once
+   * per traversal. The evaluators that do see a subtree again (user functions
+   * in HighPrecisionVisitor) re-evaluate it with new arguments, so the result
+   * depends on more than the subtree. It is for visitors that walk the same
+   * shared subtree from several places in one pass.
+   */
+  protected memoizeRules(...ruleIndices: number[]): void {
+    const rules = this.memoRules ?? new Uint8Array(VISIT_NAMES.length);
+    for (const ruleIndex of ruleIndices) rules[ruleIndex] = 1;
+    this.memoRules = rules;
+  }
+
+  /**
+   * ctx.text, cached per context for the lifetime of this visitor. ANTLR
+   * rebuilds a context's text from its whole subtree on every read; here each
+   * context is assembled once from its children's cached text, so reading a
+   * node and then its descendants (or the reverse) does not repeat the work.
+   * The subtree is walked with an explicit stack, so deep trees cannot
+   * overflow the call stack.
+   */
+  protected textOf(tree: ParseTree): string {
+    if (!(tree instanceof ParserRuleContext)) return tree.text;
+
+    let cache = this.textCache;
+    if (cache === undefined) cache = this.textCache = new WeakMap();
+    const cached = cache.get(tree);
+    if (cached !== undefined) return cached;
+
+    // A context stays on the stack until all of its child contexts have
+    // text; it is then joined from them and popped.
+    const stack: ParserRuleContext[] = [tree];
+    while (stack.length > 0) {
+      const ctx = stack[stack.length - 1];
+      const children = ctx.children;
+      const depth = stack.length;
+      if (children !== undefined) {
+        for (let i = children.length - 1; i >= 0; i--) {
+          const child = children[i];
+          if (child instanceof ParserRuleContext && !cache.has(child)) stack.push(child);
+        }
+      }
+      if (stack.length > depth) continue;
+
+      let text = '';
+      if (children !== undefined) {
+        for (let i = 0; i < children.length; i++) {
+          const child = children[i];
+          text += child instanceof ParserRuleContext ? cache.get(child)! : child.text;
+        }
+      }
+      cache.set(ctx, text);
+      stack.pop();
+    }
+    return cache.get(tree)!;
+  }
+
+  /**
+   * Fold a binary operator level `operand (OP operand)*` left to right,
+   * calling `apply` with the running result, the operator text and the next
+   * operand's result. Operands sit at the even child indices and operators
+   * between them, so the chain is read by index instead of through the typed
+   * accessors, which rescan the children on every call. Together with
+   * transparentChains, this is all an evaluator needs for the operator levels
+   * of the expression ladder.
+   */
+  protected foldChain(ctx: ParserRuleContext, apply: (left: Result, op: string, right: Result) => Result): Result {
+    const children = ctx.children!;
+    let left = this.visit(children[0]);
+    for (let i = 2; i < children.length; i += 2) {
+      left = apply(left, children[i - 1].text, this.visit(children[i]));
+    }
+    return left;
+  }
+
+  visit(tree: ParseTree): Result {
+    if (!(tree instanceof ParserRuleContext)) return tree.accept(this);
+    if (this.memoRules === undefined) return this.dispatch(tree);
+
+    if (this.visitDepth === 0) this.memo = new WeakMap();
+    this.visitDepth++;
+    try {
+      return this.dispatch(tree);
+    } finally {
+      this.visitDepth--;
+    }
+  }
+
+  private dispatch(tree: ParserRuleContext): Result {
+    const table = this.handlerTable();
+    const handlers = table.handlers;
+    let ctx = tree;
+    let handler = handlers[ctx.ruleIndex];
+    for (;;) {
+      const level = PASS_THROUGH_RULES[ctx.ruleIndex];
+      if (level === 0) break;
+      if (handler === undefined ? !table.canUnwrap : !(table.transparentChains && level === LADDER_LEVEL)) break;
+      const children = ctx.children;
+      if (children === undefined || children.length !== 1) break;
+      const child = children[0];
+      if (!(child instanceof ParserRuleContext)) break;
+      ctx = child;
+      handler = handlers[ctx.ruleIndex];
+    }
+    if (handler === undefined) return this.visitChildren(ctx);
+    const memo = this.memo;
+    if (memo !== undefined && this.memoRules![ctx.ruleIndex] === 1) {
+      if (memo.has(ctx)) return memo.get(ctx) as Result;
+      const result = handler.call(this, ctx) as Result;
+      memo.set(ctx, result);
+      return result;
+    }
+    return handler.call(this, ctx) as Result;
+  }
+
+  visitChildren(node: RuleNode): Result {
+    if (!(node instanceof ParserRuleContext)) return super.visitChildren(node);
+
+    const children = node.children;
+    if (children === undefined || children.length === 0) return this.defaultResult();
+
+    const table = this.handlerTable();
+    if (table.defaultAggregation) {
+      // The default aggregateResult keeps the last child's result and
+      // shouldVisitNextChild always continues, so skip both calls per child.
+      if (table.ignoresTokens) {
+        // Tokens would only yield defaultResult(), which matters solely when
+        // a token is the last child.
+        let last: Result | undefined;
+        for (let i = 0; i < children.length; i++) {
+          const child = children[i];
+          if (child instanceof ParserRuleContext) last = this.visit(child);
+        }
+        return children[children.length - 1] instanceof ParserRuleContext ? (last as Result) : this.defaultResult();
+      }
+      let last: Result | undefined;
+      for (let i = 0; i < children.length; i++) {
+        const child = children[i];
+        last = child instanceof ParserRuleContext ? this.visit(child) : child.accept(this);
+      }
+      return last as Result;
+    }
+
+    let result = this.defaultResult();
+    for (let i = 0; i < children.length; i++) {
+      if (!this.shouldVisitNextChild(node, result)) break;
+      const child = children[i];
+      const childResult = child instanceof ParserRuleContext ? this.visit(child) : child.accept(this);
+      result = this.aggregateResult(result, childResult);
+    }
+    return result;
+  }
+
+  /**
+   * Run the visitXxx handlers over `tree` in post-order, children before
+   * parents, using an explicit stack instead of recursion, so deep trees
+   * cannot exhaust the call stack. Handlers follow the same contract as with
+   * attach(): their return values are dropped and they must not visit()
+   * their own children. visitTerminal is not called.
+   *
+   * With `reuse`, the list of handled contexts is kept with the tree, and
+   * later reuse walks of that tree by any visitor of the same class replay
+   * the list without traversing or dispatching again. The tree must not be
+   * modified after its first reuse walk.
+   */
+  visitPostOrder(tree: ParseTree, { reuse = false }: { reuse?: boolean } = {}): void {
+    if (!(tree instanceof ParserRuleContext)) return;
+
+    const table = this.handlerTable();
+    let plan: PostOrderPlan | undefined;
+    if (reuse) {
+      let plans = postOrderPlans.get(tree);
+      if (plans === undefined) postOrderPlans.set(tree, (plans = new WeakMap()));
+      plan = plans.get(table);
+      if (plan === undefined) plans.set(table, (plan = planPostOrder(tree, table.handlers)));
+    } else {
+      plan = planPostOrder(tree, table.handlers);
+    }
+
+    const { nodes, handlers } = plan;
+    for (let i = 0; i < nodes.length; i++) handlers[i].call(this, nodes[i]);
+  }
+
+  /**
+   * Fire this visitor's visitXxx handlers from `parser` as it recognizes each
+   * rule, instead of over a finished tree. Turns off parse-tree construction
+   * unless `buildParseTree` is set, and returns the installed listener so it
+   * can be removed with parser.removeParseListener().
+   *
+   * Handlers run on rule exit, children before parents, and their return
+   * values are dropped, so streaming visitors collect results in fields.
+   * Rules without a handler are skipped rather than sent to visitChildren.
+   * Without a tree a context holds its own tokens but no child rules; a
+   * handler that reads ctx.children or child-rule accessors needs
+   * `buildParseTree: true`, and must not visit() those children since their
+   * handlers have already run.
+   */
+  attach(parser: Parser, { buildParseTree = false }: { buildParseTree?: boolean } = {}): ParseTreeListener {
+    const handlers = this.handlerTable().handlers;
+    const listener: ParseTreeListener = {
+      exitEveryRule: (ctx: ParserRuleContext): void => {
+        const handler = handlers[ctx.ruleIndex];
+        if (handler !== undefined) handler.call(this, ctx);
+      },
+    };
+    parser.buildParseTree = buildParseTree;
+    parser.addParseListener(listener);
+    return listener;
+  }
+}
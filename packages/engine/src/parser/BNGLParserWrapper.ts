@@ -4,10 +4,11 @@
  * Parses BNGL files using the ANTLR4 grammar and converts to ParsedBNGL type.
  * Provides BNG2.pl-compatible parsing for maximum parity.
  */
-import { CharStreams, CommonTokenStream } from 'antlr4ts';
-import { BNGLexer } from './generated/BNGLexer';
-import { BNGParser } from './generated/BNGParser';
+import type { ProgContext } from './generated/BNGParser';
 import { BNGLVisitor } from './BNGLVisitor';
+import { withParser, isRuleMemoized } from './SharedParser';
+import { getBoundedCache, setBoundedCache } from '../utils/boundedCache';
+import { registerCacheClearCallback } from '../featureFlags';
 import type { BNGLModel } from '../types';
 
 export interface ParseError {
@@ -22,6 +23,41 @@ export interface ParseResult {
   errors: ParseError[];
 }
 
+// Parse trees for recently seen (normalized) sources, with their syntax errors.
+// The visitor only reads the tree, so a cached tree can be re-visited to build
+// a fresh BNGLModel; editors and batch runners re-parse the same text often.
+// Only used when 'prog' memoization is enabled (see setMemoizedRules).
+const parseTreeCache = new Map<string, { tree: ProgContext; errors: ParseError[] }>();
+const MAX_PARSE_TREE_CACHE_SIZE = 8;
+
+/**
+ * Clear the parse-tree cache used by parseBNGLWithANTLR.
+ */
+export function clearParseTreeCache(): void {
+  parseTreeCache.clear();
+}
+
+registerCacheClearCallback(clearParseTreeCache);
+
+function parseProgram(source: string, errors: ParseError[]): ProgContext {
+  if (!isRuleMemoized('prog')) {
+    parseTreeCache.clear();
+    return withParser(source, errors, (parser) => parser.prog());
+  }
+
+  const cached = getBoundedCache(parseTreeCache, source);
+  if (cached) {
+    errors.push(...cached.errors);
+    return cached.tree;
+  }
+
+  const syntaxErrors: ParseError[] = [];
+  const tree = withParser(source, syntaxErrors, (parser) => parser.prog());
+  setBoundedCache(parseTreeCache, source, { tree, errors: syntaxErrors }, MAX_PARSE_TREE_CACHE_SIZE);
+  errors.push(...syntaxErrors);
+  return tree;
+}
+
 /**
  * Parse a BNGL file using ANTLR4 grammar
  */
@@ -372,36 +408,15 @@ export function parseBNGLWithANTLR(input: string): ParseResult {
       console.warn(`[BNGL parser] ${warning}`);
     }
 
-    const inputStream = CharStreams.fromString(sanitizedInput);
-    const lexer = new BNGLexer(inputStream);
-
-    // Collect lexer errors
-    lexer.removeErrorListeners();
-    lexer.addErrorListener({
-      syntaxError: (_recognizer, _offendingSymbol, line, charPositionInLine, msg) => {
-        errors.push({ line, column: charPositionInLine, message: msg });
-      }
-    });
-
-    const tokenStream = new CommonTokenStream(lexer);
-    const parser = new BNGParser(tokenStream);
-
-    // Collect parser errors
-    parser.removeErrorListeners();
-    parser.addErrorListener({
-      syntaxError: (_recognizer, _offendingSymbol, line, charPositionInLine, msg) => {
-        errors.push({ line, column: charPositionInLine, message: msg });
-      }
-    });
-
-    // Parse the input
-    // Parse the input
-    const tree = parser.prog();
+    // Parse the input, collecting lexer and parser errors
+    const tree = parseProgram(sanitizedInput, errors);
 
     // Visit the parse tree and build BNGLModel even if there are errors (best effort)
     let model: BNGLModel | undefined;
     try {
-      const visitor = new BNGLVisitor();
+      // Uncached trees are only referenced here, so blocks can be released as
+      // soon as they are visited.
+      const visitor = new BNGLVisitor({ releaseBlocks: !isRuleMemoized('prog') });
       model = visitor.visit(tree);
     } catch (visitorError: any) {
       console.error('Visitor exception:', visitorError);
@@ -0,0 +1,376 @@
+/**
+ * Rule-indexed listener dispatch for BNGParser parse trees.
+ *
+ * The contexts in ./generated were emitted without per-rule listener hooks, so
+ * ParserRuleContext.enterRule/exitRule are no-ops and ANTLR's stock
+ * ParseTreeWalker never reaches BNGParserListener's enterXxx/exitXxx methods.
+ * BNGLTreeWalker resolves those hooks by rule index instead. The lookup is done
+ * once per listener and cached, so rules the listener does not handle cost a
+ * single array load per node rather than a property miss and a call.
+ */
+import { ParseTreeWalker } from 'antlr4ts/tree/ParseTreeWalker.js';
+import type { ParseTree } from 'antlr4ts/tree/ParseTree.js';
+import type { ParseTreeListener } from 'antlr4ts/tree/ParseTreeListener.js';
+import type { RuleNode } from 'antlr4ts/tree/RuleNode.js';
+import { TerminalNode } from 'antlr4ts/tree/TerminalNode.js';
+import { ErrorNode } from 'antlr4ts/tree/ErrorNode.js';
+import { ParserRuleContext } from 'antlr4ts/ParserRuleContext.js';
+import { BNGParser } from './generated/BNGParser.ts';
+import type { BNGParserListener } from './generated/BNGParserListener.ts';
+
+type RuleHook = (ctx: ParserRuleContext) => void;
+
+interface HookTable {
+  enter: Array<RuleHook | undefined>;
+  exit: Array<RuleHook | undefined>;
+  // Per rule: HAS_ENTER | HAS_EXIT bits for the hooks above.
+  mask: Uint8Array;
+}
+
+const HAS_ENTER = 1;
+const HAS_EXIT = 2;
+
+// Listener (or listener prototype) -> resolved hooks. Weak so short-lived
+// listeners are not pinned. Hooks are resolved on a listener's first walk;
+// hooks added afterwards are not seen.
+const hookTables = new WeakMap<object, HookTable>();
+
+// Listeners currently being walked. Listener hooks typically accumulate
+// per-walk state, so a listener may not be walked again from inside its own
+// walk (e.g. from a hook).
+const activeListeners = new Set<ParseTreeListener>();
+
+function hookName(prefix: 'enter' | 'exit', ruleName: string): string {
+  return prefix + ruleName.charAt(0).toUpperCase() + ruleName.slice(1);
+}
+
+// enterXxx/exitXxx method names by rule index, built once at load.
+const ENTER_HOOK_NAMES: readonly string[] = BNGParser.ruleNames.map((name) => hookName('enter', name));
+const EXIT_HOOK_NAMES: readonly string[] = BNGParser.ruleNames.map((name) => hookName('exit', name));
+
+// Hook method name -> rule index, for both phases.
+const HOOK_RULE_INDEX = new Map<string, number>();
+ENTER_HOOK_NAMES.forEach((name, i) => HOOK_RULE_INDEX.set(name, i));
+EXIT_HOOK_NAMES.forEach((name, i) => HOOK_RULE_INDEX.set(name, i));
+
+function createHookTable(): HookTable {
+  const ruleCount = BNGParser.ruleNames.length;
+  return {
+    enter: new Array<RuleHook | undefined>(ruleCount),
+    exit: new Array<RuleHook | undefined>(ruleCount),
+    mask: new Uint8Array(ruleCount),
+  };
+}
+
+function setHook(table: HookTable, phase: 'enter' | 'exit', ruleIndex: number, hook: RuleHook): void {
+  table[phase][ruleIndex] = hook;
+  table.mask[ruleIndex] |= phase === 'enter' ? HAS_ENTER : HAS_EXIT;
+}
+
+function hasOwnHooks(listener: object): boolean {
+  for (const key of Object.getOwnPropertyNames(listener)) {
+    if (HOOK_RULE_INDEX.has(key)) return true;
+  }
+  return false;
+}
+
+function resolveHookTable(listener: ParseTreeListener): HookTable {
+  let table = hookTables.get(listener);
+  if (table) return table;
+
+  // Class-based listeners normally define their hooks as methods, so every
+  // instance resolves to the same table. Share it through the prototype
+  // instead of building one per instance.
+  const proto: object | null = Object.getPrototypeOf(listener);
+  const owner = proto !== null && proto !== Object.prototype && !hasOwnHooks(listener) ? proto : listener;
+  table = hookTables.get(owner);
+  if (!table) {
+    const hooks = listener as unknown as Record<string, unknown>;
+    table = createHookTable();
+    for (let i = 0; i < ENTER_HOOK_NAMES.length; i++) {
+      const enter = hooks[ENTER_HOOK_NAMES[i]];
+      const exit = hooks[EXIT_HOOK_NAMES[i]];
+      if (typeof enter === 'function') setHook(table, 'enter', i, enter as RuleHook);
+      if (typeof exit === 'function') setHook(table, 'exit', i, exit as RuleHook);
+    }
+    hookTables.set(owner, table);
+  }
+  hookTables.set(listener, table);
+  return table;
+}
+
+/**
+ * ParseTreeWalker that dispatches BNGParserListener hooks by rule index.
+ * enterEveryRule/exitEveryRule, visitTerminal and visitErrorNode behave exactly
+ * as in the stock walker.
+ */
+export class BNGLTreeWalker extends ParseTreeWalker {
+  /**
+   * Walk `t` with `listener`. Throws if the listener is already in a walk.
+   */
+  walk<T extends ParseTreeListener>(listener: T, t: ParseTree): void {
+    if (activeListeners.has(listener)) {
+      throw new Error('BNGLTreeWalker: listener is already in a walk; use one listener instance per walk');
+    }
+    activeListeners.add(listener);
+    try {
+      this.walkTree(listener, t);
+    } finally {
+      activeListeners.delete(listener);
+    }
+  }
+
+  /**
+   * Explicit-stack pre/post-order walk over ParserRuleContext.children.
+   * Reads the children arrays directly instead of going through
+   * childCount/getChild per step, and skips token nodes outright when the
+   * listener has neither visitTerminal nor visitErrorNode.
+   */
+  private walkTree(listener: ParseTreeListener, t: ParseTree): void {
+    const wantsTokens = !!(listener.visitTerminal || listener.visitErrorNode);
+
+    if (!(t instanceof ParserRuleContext)) {
+      if (wantsTokens) this.visitToken(listener, t as TerminalNode);
+      return;
+    }
+
+    // Everything the loop touches per node is read into locals up front:
+    // the hook arrays and bitmap, the every-rule hooks and whether a
+    // subclass has overridden enterRule/exitRule (then those are called for
+    // every rule instead).
+    const table = resolveHookTable(listener);
+    const mask = table.mask;
+    const enterHooks = table.enter;
+    const exitHooks = table.exit;
+    const enterEveryRule = listener.enterEveryRule;
+    const exitEveryRule = listener.exitEveryRule;
+    const customDispatch =
+      this.enterRule !== BNGLTreeWalker.prototype.enterRule ||
+      this.exitRule !== BNGLTreeWalker.prototype.exitRule;
+
+    const nodeStack: ParserRuleContext[] = [];
+    const indexStack: number[] = [];
+    let node: ParserRuleContext = t;
+    let index = 0;
+    let entering = true;
+
+    for (;;) {
+      if (entering) {
+        entering = false;
+        if (customDispatch) {
+          this.enterRule(listener, node);
+        } else {
+          if (enterEveryRule !== undefined) enterEveryRule.call(listener, node);
+          const rule = node.ruleIndex;
+          if ((mask[rule] & HAS_ENTER) !== 0) enterHooks[rule]!.call(listener, node);
+        }
+      }
+
+      const children = node.children;
+      if (children !== undefined && index < children.length) {
+        const child = children[index++];
+        if (child instanceof TerminalNode) {
+          if (wantsTokens) this.visitToken(listener, child);
+          continue;
+        }
+        // Descend into the child rule.
+        nodeStack.push(node);
+        indexStack.push(index);
+        node = child as ParserRuleContext;
+        index = 0;
+        entering = true;
+        continue;
+      }
+
+      // All children done: post-order exit, then resume the parent.
+      if (customDispatch) {
+        this.exitRule(listener, node);
+      } else {
+        const rule = node.ruleIndex;
+        if ((mask[rule] & HAS_EXIT) !== 0) exitHooks[rule]!.call(listener, node);
+        if (exitEveryRule !== undefined) exitEveryRule.call(listener, node);
+      }
+      if (nodeStack.length === 0) break;
+      node = nodeStack.pop()!;
+      index = indexStack.pop()!;
+    }
+  }
+
+  private visitToken(listener: ParseTreeListener, node: TerminalNode): void {
+    if (node instanceof ErrorNode) {
+      if (listener.visitErrorNode) listener.visitErrorNode(node);
+    } else if (listener.visitTerminal) {
+      listener.visitTerminal(node);
+    }
+  }
+
+  protected enterRule(listener: ParseTreeListener, r: RuleNode): void {
+    const ctx = r.ruleContext as ParserRuleContext;
+    if (listener.enterEveryRule) {
+      listener.enterEveryRule(ctx);
+    }
+    const hook = resolveHookTable(listener).enter[ctx.ruleIndex];
+    if (hook) hook.call(listener, ctx);
+  }
+
+  protected exitRule(listener: ParseTreeListener, r: RuleNode): void {
+    const ctx = r.ruleContext as ParserRuleContext;
+    const hook = resolveHookTable(listener).exit[ctx.ruleIndex];
+    if (hook) hook.call(listener, ctx);
+    if (listener.exitEveryRule) {
+      listener.exitEveryRule(ctx);
+    }
+  }
+}
+
+/**
+ * Build a frozen listener holding only the supplied function-valued hooks.
+ * Its hook table is derived from those keys alone rather than by probing every
+ * rule name, and no enterXxx/exitXxx it does not define is ever looked up.
+ * Hooks are called with the returned object as `this`.
+ */
+export function defineListener(hooks: BNGParserListener): BNGParserListener {
+  const source = hooks as unknown as Record<string, unknown>;
+  const listener: Record<string, unknown> = Object.create(null);
+  const table = createHookTable();
+
+  for (const key of Object.keys(source)) {
+    const hook = source[key];
+    if (typeof hook !== 'function') continue;
+    listener[key] = hook;
+
+    const ruleIndex = HOOK_RULE_INDEX.get(key);
+    if (ruleIndex === undefined) continue;
+    setHook(table, key.startsWith('enter') ? 'enter' : 'exit', ruleIndex, hook as RuleHook);
+  }
+
+  Object.freeze(listener);
+  hookTables.set(listener, table);
+  return listener as BNGParserListener;
+}
+
+const NOOP: RuleHook = () => {};
+
+/**
+ * Listener base that routes enterEveryRule/exitEveryRule through rule-indexed
+ * handler arrays. Subclasses register handlers with onEnter/onExit (usually in
+ * their constructor) instead of defining enterXxx/exitXxx methods, so dispatch
+ * is one array load per node under any walker, including ANTLR's stock
+ * ParseTreeWalker and parser parse-listeners.
+ */
+export abstract class RuleDispatchListener implements ParseTreeListener {
+  private readonly enterHandlers: RuleHook[] = new Array<RuleHook>(BNGParser.ruleNames.length).fill(NOOP);
+  private readonly exitHandlers: RuleHook[] = new Array<RuleHook>(BNGParser.ruleNames.length).fill(NOOP);
+
+  /** Register a handler for entering rule `ruleIndex` (a BNGParser.RULE_* constant). */
+  protected onEnter<T extends ParserRuleContext>(ruleIndex: number, handler: (ctx: T) => void): void {
+    this.enterHandlers[ruleIndex] = handler as RuleHook;
+  }
+
+  /** Register a handler for exiting rule `ruleIndex` (a BNGParser.RULE_* constant). */
+  protected onExit<T extends ParserRuleContext>(ruleIndex: number, handler: (ctx: T) => void): void {
+    this.exitHandlers[ruleIndex] = handler as RuleHook;
+  }
+
+  enterEveryRule(ctx: ParserRuleContext): void {
+    this.enterHandlers[ctx.ruleIndex].call(this, ctx);
+  }
+
+  exitEveryRule(ctx: ParserRuleContext): void {
+    this.exitHandlers[ctx.ruleIndex].call(this, ctx);
+  }
+}
+
+/** Phase passed to PhasedRuleListener handlers. */
+export enum RulePhase {
+  ENTER = 0,
+  EXIT = 1,
+}
+
+type PhasedHook = (ctx: ParserRuleContext, phase: RulePhase) => void;
+
+/**
+ * Listener base with one handler per rule for both phases. A handler gets the
+ * context and RulePhase.ENTER or RulePhase.EXIT, so a rule that needs both does its work in one
+ * function. Phases a rule is not registered for are skipped after a single
+ * array load.
+ */
+export abstract class PhasedRuleListener implements ParseTreeListener {
+  // Handlers at ruleIndex * 2 + phase.
+  private readonly handlers = new Array<PhasedHook | undefined>(BNGParser.ruleNames.length * 2);
+
+  /**
+   * Register `handler` for rule `ruleIndex` (a BNGParser.RULE_* constant),
+   * for `phase` only or for both phases when it is omitted.
+   */
+  protected onRule<T extends ParserRuleContext>(
+    ruleIndex: number,
+    handler: (ctx: T, phase: RulePhase) => void,
+    phase?: RulePhase
+  ): void {
+    if (phase !== RulePhase.EXIT) this.handlers[ruleIndex * 2 + RulePhase.ENTER] = handler as PhasedHook;
+    if (phase !== RulePhase.ENTER) this.handlers[ruleIndex * 2 + RulePhase.EXIT] = handler as PhasedHook;
+  }
+
+  enterEveryRule(ctx: ParserRuleContext): void {
+    const handler = this.handlers[ctx.ruleIndex * 2];
+    if (handler !== undefined) handler.call(this, ctx, RulePhase.ENTER);
+  }
+
+  exitEveryRule(ctx: ParserRuleContext): void {
+    const handler = this.handlers[ctx.ruleIndex * 2 + 1];
+    if (handler !== undefined) handler.call(this, ctx, RulePhase.EXIT);
+  }
+}
+
+const defaultWalker = new BNGLTreeWalker();
+
+/**
+ * Walk a BNGParser parse tree, firing the listener's enterXxx/exitXxx hooks.
+ */
+export function walkParseTree(listener: BNGParserListener, tree: ParseTree): void {
+  defaultWalker.walk(listener, tree);
+}
+
+/**
+ * Walk each tree in turn with a fresh listener from `factory` and return the
+ * listeners in tree order. Listeners are never shared between trees, and the
+ * trees are only read.
+ */
+export function walkMany<L extends BNGParserListener>(factory: () => L, trees: Iterable<ParseTree>): L[] {
+  const listeners: L[] = [];
+  for (const tree of trees) {
+    const listener = factory();
+    defaultWalker.walk(listener, tree);
+    listeners.push(listener);
+  }
+  return listeners;
+}
+
+/**
+ * Adapt a BNGParserListener for use as a parser parse-listener
+ * (Parser.addParseListener). The parser only calls enterEveryRule and
+ * exitEveryRule, so the adapter forwards those to the listener's
+ * enterXxx/exitXxx hooks by rule index, in the same order BNGLTreeWalker uses.
+ */
+export function asParseListener(listener: BNGParserListener): ParseTreeListener {
+  const { enter, exit } = resolveHookTable(listener);
+  return {
+    enterEveryRule(ctx: ParserRuleContext): void {
+      if (listener.enterEveryRule) listener.enterEveryRule(ctx);
+      const hook = enter[ctx.ruleIndex];
+      if (hook) hook.call(listener, ctx);
+    },
+    exitEveryRule(ctx: ParserRuleContext): void {
+      const hook = exit[ctx.ruleIndex];
+      if (hook) hook.call(listener, ctx);
+      if (listener.exitEveryRule) listener.exitEveryRule(ctx);
+    },
+    visitTerminal(node: TerminalNode): void {
+      if (listener.visitTerminal) listener.visitTerminal(node);
+    },
+    visitErrorNode(node: ErrorNode): void {
+      if (listener.visitErrorNode) listener.visitErrorNode(node);
+    },
+  };
+}
@@ -4,7 +4,7 @@ import { BNGLParser as CoreBNGLParser } from '../services/graph/core/BNGLParser.
  * 
  * Converts ANTLR4 parse tree to BNGLModel type.
  */
-import { AbstractParseTreeVisitor } from 'antlr4ts/tree/AbstractParseTreeVisitor.js';
+import { BNGLParseTreeVisitor } from './BNGLParseTreeVisitor.ts';
 import type { BNGParserVisitor } from './generated/BNGParserVisitor.ts';
 import * as Parser from './generated/BNGParser.ts';
 import type {
@@ -30,7 +30,7 @@ const visitorDebugLog = (...args: unknown[]): void => {
   console.log(...args);
 };
 
-export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements BNGParserVisitor<any> {
+export class BNGLVisitor extends BNGLParseTreeVisitor<BNGLModel> implements BNGParserVisitor<any> {
   private parameters: Record<string, number> = {};
   private moleculeTypes: BNGLMoleculeType[] = [];
   private species: BNGLSpecies[] = [];
@@ -48,6 +48,17 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
   private actions: BNGLAction[] = [];
   private speciesExpressions: string[] = [];
   private energyPatterns: BNGLEnergyPattern[] = [];
+  private readonly releaseBlocks: boolean;
+
+  /**
+   * @param options.releaseBlocks - drop each top-level block's subtree once it
+   *   has been visited, so its contexts and tokens can be collected while the
+   *   rest of the model is still being built. Only for trees nobody else holds.
+   */
+  constructor(options: { releaseBlocks?: boolean } = {}) {
+    super();
+    this.releaseBlocks = options.releaseBlocks ?? false;
+  }
 
   protected defaultResult(): BNGLModel {
     return {
@@ -80,6 +91,8 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
         console.error('Error visiting program block:', e.message);
         console.error(e.stack);
         throw e;
+      } finally {
+        if (this.releaseBlocks) block.children = undefined;
       }
     }
 
@@ -307,7 +320,7 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
       const nameCtx = paramNames[paramNames.length > 1 && ctx.COLON() ? 1 : 0];
       const name = nameCtx?.text || '';
 
-      const value = ctx.expression() ? ctx.expression()!.text : undefined;
+      const value = ctx.expression() ? this.textOf(ctx.expression()!) : undefined;
 
       if (!name || !value) return;
 
@@ -419,9 +432,9 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
       name,
       initialConcentration: concentration,
       isConstant,
-      initialExpression: exprCtx ? exprCtx.text : '0'
+      initialExpression: exprCtx ? this.textOf(exprCtx) : '0'
     });
-    this.speciesExpressions.push(exprCtx ? exprCtx.text : '0');
+    this.speciesExpressions.push(exprCtx ? this.textOf(exprCtx) : '0');
   }
 
   // Observables block
@@ -686,7 +699,7 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
       products,
       rate,
       rateExpression: rate, // Always preserve the rate expression string
-      reactionString: reactantCtx.text + (isBidirectional ? ' <-> ' : ' -> ') + productCtx.text,
+      reactionString: this.textOf(reactantCtx) + (isBidirectional ? ' <-> ' : ' -> ') + this.textOf(productCtx),
       reverseRate,
       isBidirectional,
       deleteMolecules,
@@ -774,7 +787,7 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
     if (!speciesDef || !expr) return;
 
     const pattern = this.getSpeciesString(speciesDef, { completeMissingComponents: false });
-    const expression = expr.text;
+    const expression = this.textOf(expr);
 
     // Optional label
     const labelNode = ctx.STRING();
@@ -1167,7 +1180,7 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
       const nameNode = mp.STRING() || (mp as any).keyword_as_mol_name?.();
       if (!nameNode) return '';
       const name = nameNode.text;
-      const rawPatternText = mp.text?.replace(/\s+/g, '') ?? '';
+      const rawPatternText = this.textOf(mp).replace(/\s+/g, '');
       const compListCtx = mp.component_pattern_list();
 
       const shouldComplete = options.completeMissingComponents === true;
@@ -1293,7 +1306,7 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
       return molStr;
     }).filter(m => m); // Filter out empty molecules
 
-    const rawSpeciesText = ctx.text?.replace(/\s+/g, '') ?? '';
+    const rawSpeciesText = this.textOf(ctx).replace(/\s+/g, '');
     let res = prefix + molecules.join('.');
 
     // Handle species-level suffix compartment (AT STRING at end) - e.g., A.B@PM
@@ -1338,12 +1351,12 @@ export class BNGLVisitor extends AbstractParseTreeVisitor<BNGLModel> implements
 
   // Helper: Get expression text (preserving structure)
   private getExpressionText(ctx: Parser.ExpressionContext): string {
-    return ctx.text;
+    return this.textOf(ctx);
   }
 
   // Helper: Evaluate expression to number
   private evaluateExpression(ctx: Parser.ExpressionContext): number {
-    const text = ctx.text;
+    const text = this.textOf(ctx);
 
     // Convert parameters record to Map
     const paramMap = new Map<string, number>(Object.entries(this.parameters));
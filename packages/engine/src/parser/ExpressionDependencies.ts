@@ -1,11 +1,15 @@
 
-import { CharStreams, CommonTokenStream } from 'antlr4ts';
-import { AbstractParseTreeVisitor } from 'antlr4ts/tree/AbstractParseTreeVisitor.js';
-import { BNGLexer } from './generated/BNGLexer.ts';
-import { BNGParser, Arg_nameContext, Observable_refContext, Function_callContext } from './generated/BNGParser.ts';
-import type { BNGParserVisitor } from './generated/BNGParserVisitor.ts';
+import { BNGParser, Arg_nameContext, Observable_refContext } from './generated/BNGParser.ts';
+import { BNGLParseTreeVisitor } from './BNGLParseTreeVisitor.ts';
+import { RuleDispatchListener } from './BNGLTreeWalker.ts';
+import { withParser, isRuleMemoized } from './SharedParser.ts';
+import { setBoundedCache } from '../utils/boundedCache.ts';
+import { registerCacheClearCallback } from '../featureFlags.ts';
 
-export class DependencyVisitor extends AbstractParseTreeVisitor<void> implements BNGParserVisitor<void> {
+// Only collects names, so every other rule (including built-in function calls,
+// whose names are not dependencies) goes through the base class's plain
+// visitChildren loop.
+export class DependencyVisitor extends BNGLParseTreeVisitor<void> {
     public dependencies = new Set<string>();
 
     protected defaultResult(): void {}
@@ -33,14 +37,44 @@ export class DependencyVisitor extends AbstractParseTreeVisitor<void> implements
         // Visit children to process arguments (A, B)
         this.visitChildren(ctx); 
     }
+}
+
+/**
+ * Parse listener that records dependencies while the expression is being
+ * parsed, so no parse tree has to be built and walked afterwards. Collects the
+ * same names, in the same order, as DependencyVisitor.
+ */
+class DependencyCollector extends RuleDispatchListener {
+    public dependencies = new Set<string>();
 
-    visitFunction_call(ctx: Function_callContext): void {
-        // Built-in functions (sin, exp) are NOT dependencies.
-        // Just visit children arguments.
-        this.visitChildren(ctx);
+    constructor() {
+        super();
+        // The callee name is the rule's first token, so it can be recorded on
+        // entry, ahead of any names in the argument list.
+        this.onEnter<Observable_refContext>(BNGParser.RULE_observable_ref, (ctx) => {
+            this.dependencies.add(ctx.start.text!);
+        });
+        this.onExit<Arg_nameContext>(BNGParser.RULE_arg_name, (ctx) => {
+            if (ctx.text) this.dependencies.add(ctx.text);
+        });
     }
 }
 
+// Expression text -> dependency names, in first-seen order. The same rate
+// laws and function bodies are analysed again and again (per rule, per
+// reaction, per validation pass), so repeat lookups skip the parse entirely.
+const dependencyCache = new Map<string, readonly string[]>();
+const MAX_DEPENDENCY_CACHE_SIZE = 2000;
+
+/**
+ * Clear the memoized results of getExpressionDependencies().
+ */
+export function clearExpressionDependencyCache(): void {
+    dependencyCache.clear();
+}
+
+registerCacheClearCallback(clearExpressionDependencyCache);
+
 /**
  * Extracts all identifiers (observables, functions, parameters) from an expression string using ANTLR parser.
  * This ensures robust parsing of nested function calls and avoids regex pitfalls.
@@ -49,20 +83,30 @@ export function getExpressionDependencies(expression: string): Set<string> {
     // Return empty for empty strings
     if (!expression || !expression.trim()) return new Set();
 
-    try {
-        const inputStream = CharStreams.fromString(expression);
-        const lexer = new BNGLexer(inputStream);
-        const tokenStream = new CommonTokenStream(lexer);
-        const parser = new BNGParser(tokenStream);
+    const memoize = isRuleMemoized('expression');
+    if (!memoize) {
+        dependencyCache.clear();
+    } else {
+        const cached = dependencyCache.get(expression);
+        if (cached !== undefined) return new Set(cached);
+    }
 
-        // Turn off default error logging to avoid console spam on invalid fragments (if any)
-        parser.removeErrorListeners(); 
-        
-        const tree = parser.expression();
-        const visitor = new DependencyVisitor();
-        visitor.visit(tree);
+    try {
+        // Syntax errors on invalid fragments are dropped rather than logged.
+        const dependencies = withParser(expression, undefined, (parser) => {
+            const collector = new DependencyCollector();
+            // Tokens are still attached to each rule context while it is
+            // active, which is all the collector reads.
+            parser.buildParseTree = false;
+            parser.addParseListener(collector);
+            parser.expression();
+            return collector.dependencies;
+        });
 
-        return visitor.dependencies;
+        if (memoize) {
+            setBoundedCache(dependencyCache, expression, Array.from(dependencies), MAX_DEPENDENCY_CACHE_SIZE);
+        }
+        return dependencies;
     } catch (e) {
         // Fallback or explicit warning
         console.warn(`[getExpressionDependencies] Failed to parse '${expression}':`, e);
@@ -0,0 +1,338 @@
+/**
+ * Shared BNGLexer/BNGParser instances.
+ *
+ * antlr4ts keeps the deserialized ATN and its prediction DFA on the generated
+ * recognizer classes (BNGParser._ATN / BNGLexer._ATN), so those caches are
+ * already shared by every parser in the process. What each parse still paid
+ * for was a fresh lexer/parser pair with its own interpreters and error
+ * listeners; here a single pair is re-pointed at new input instead.
+ */
+import {
+  BailErrorStrategy,
+  CharStreams,
+  CommonToken,
+  CommonTokenFactory,
+  CommonTokenStream,
+  DefaultErrorStrategy,
+} from 'antlr4ts';
+import type { CharStream, TokenSource } from 'antlr4ts';
+import { Interval } from 'antlr4ts/misc/Interval.js';
+import type { ATN } from 'antlr4ts/atn/ATN.js';
+import { PredictionMode } from 'antlr4ts/atn/PredictionMode.js';
+import { ParseCancellationException } from 'antlr4ts/misc/ParseCancellationException.js';
+import { BNGLexer } from './generated/BNGLexer.ts';
+import { BNGParser } from './generated/BNGParser.ts';
+import type { BNGParserListener } from './generated/BNGParserListener.ts';
+import type { ParseError } from './BNGLParserWrapper.ts';
+import { asParseListener } from './BNGLTreeWalker.ts';
+import { registerCacheClearCallback } from '../featureFlags.ts';
+import type { BNGLParseTreeVisitor } from './BNGLParseTreeVisitor.ts';
+
+// Total DFA states (parser + lexer) above which the shared prediction caches
+// are dropped after a parse. The DFA only grows, so a long-lived worker that
+// sees many unrelated models would otherwise keep every state it ever built.
+const DEFAULT_DFA_TRIM_THRESHOLD = 250_000;
+let dfaTrimThreshold = DEFAULT_DFA_TRIM_THRESHOLD;
+
+let sharedLexer: BNGLexer | undefined;
+let sharedParser: BNGParser | undefined;
+let inUse = false;
+
+// Where the shared recognizers' syntax errors go for the current parse.
+let errorSink: ParseError[] | undefined;
+// Set during the SLL pass, whose parser errors are discarded (the input is
+// re-parsed with full LL, which reports them).
+let muteParserErrors = false;
+
+const collectSyntaxError = (
+  _recognizer: unknown,
+  _offendingSymbol: unknown,
+  line: number,
+  charPositionInLine: number,
+  msg: string
+): void => {
+  errorSink?.push({ line, column: charPositionInLine, message: msg });
+};
+
+const collectParserSyntaxError: typeof collectSyntaxError = (...args) => {
+  if (!muteParserErrors) collectSyntaxError(...args);
+};
+
+// Identifier text -> one shared copy. A model repeats the same molecule,
+// site, state and parameter names many times, and by default a token has no
+// stored text: every token.text read decodes a new string from the input.
+const MAX_INTERNED_NAMES = 50_000;
+const internedNames = new Map<string, string>();
+
+function internName(text: string): string {
+  const interned = internedNames.get(text);
+  if (interned !== undefined) return interned;
+  if (internedNames.size >= MAX_INTERNED_NAMES) internedNames.clear();
+  internedNames.set(text, text);
+  return text;
+}
+
+/**
+ * Token factory that gives every identifier (STRING) token its interned text
+ * up front, so repeated names share one string.
+ */
+class InterningTokenFactory extends CommonTokenFactory {
+  create(
+    source: { source?: TokenSource; stream?: CharStream },
+    type: number,
+    text: string | undefined,
+    channel: number,
+    start: number,
+    stop: number,
+    line: number,
+    charPositionInLine: number
+  ): CommonToken {
+    const token = super.create(source, type, text, channel, start, stop, line, charPositionInLine);
+    if (type === BNGLexer.STRING && text === undefined && source.stream) {
+      token.text = internName(source.stream.getText(Interval.of(start, stop)));
+    }
+    return token;
+  }
+}
+
+const internTokenFactory = new InterningTokenFactory();
+
+/**
+ * Drop the pool of interned identifier names. Tokens already created keep
+ * their text.
+ */
+export function clearInternedNames(): void {
+  internedNames.clear();
+}
+
+registerCacheClearCallback(clearInternedNames);
+
+function createRecognizers(): { lexer: BNGLexer; parser: BNGParser } {
+  const lexer = new BNGLexer(CharStreams.fromString(''));
+  lexer.tokenFactory = internTokenFactory;
+  lexer.removeErrorListeners();
+  lexer.addErrorListener({ syntaxError: collectSyntaxError });
+
+  const parser = new BNGParser(new CommonTokenStream(lexer));
+  parser.removeErrorListeners();
+  parser.addErrorListener({ syntaxError: collectParserSyntaxError });
+  return { lexer, parser };
+}
+
+/**
+ * Run `parse` with a BNGParser positioned at the start of `input`.
+ *
+ * Lexer and parser syntax errors are appended to `errors` (dropped when it is
+ * omitted). The parser is only valid inside the callback. A nested call made
+ * while the shared pair is busy gets a private pair, so callers never see each
+ * other's state.
+ *
+ * `parse` is first run in SLL prediction mode with a bail-out error strategy,
+ * which is enough for almost all BNGL and much cheaper on the expression
+ * ladder. If that pass hits a syntax error or an SLL conflict, the parser is
+ * rewound and `parse` runs again with full LL and normal error recovery, so
+ * the syntax errors reported are exactly those of a plain LL parse. `parse`
+ * must therefore set up any parse listeners itself and be safe to call twice.
+ * Pass `twoStage: false` to go straight to LL when it is not.
+ */
+export function withParser<T>(
+  input: string,
+  errors: ParseError[] | undefined,
+  parse: (parser: BNGParser) => T,
+  { twoStage = true }: { twoStage?: boolean } = {}
+): T {
+  const nested = inUse;
+  let lexer: BNGLexer;
+  let parser: BNGParser;
+  if (nested) {
+    ({ lexer, parser } = createRecognizers());
+  } else {
+    if (!sharedLexer || !sharedParser) {
+      ({ lexer: sharedLexer, parser: sharedParser } = createRecognizers());
+    }
+    lexer = sharedLexer;
+    parser = sharedParser;
+  }
+
+  lexer.inputStream = CharStreams.fromString(input);
+  parser.inputStream = new CommonTokenStream(lexer);
+
+  const outerSink = errorSink;
+  const outerMute = muteParserErrors;
+  errorSink = errors;
+  inUse = true;
+  try {
+    if (twoStage) {
+      parser.buildParseTree = true;
+      parser.removeParseListeners();
+      parser.interpreter.setPredictionMode(PredictionMode.SLL);
+      parser.errorHandler = new BailErrorStrategy();
+      muteParserErrors = true;
+      try {
+        return parse(parser);
+      } catch (e) {
+        if (!(e instanceof ParseCancellationException)) throw e;
+      }
+
+      // Rewinds the token stream; tokens already lexed (and their lexer
+      // errors) are not produced again.
+      parser.reset();
+    }
+    parser.buildParseTree = true;
+    parser.removeParseListeners();
+    parser.interpreter.setPredictionMode(PredictionMode.LL);
+    parser.errorHandler = new DefaultErrorStrategy();
+    muteParserErrors = false;
+    return parse(parser);
+  } finally {
+    errorSink = outerSink;
+    muteParserErrors = outerMute;
+    if (!nested) {
+      inUse = false;
+      // Drop references to this input so the shared pair does not pin it.
+      lexer.inputStream = CharStreams.fromString('');
+      parser.inputStream = new CommonTokenStream(lexer);
+      trimDFACache();
+    }
+  }
+}
+
+/** Entry rules whose results may be memoized by source text. */
+export type MemoizableRule = 'prog' | 'expression';
+
+const MEMOIZABLE_RULES: ReadonlySet<string> = new Set<MemoizableRule>(['prog', 'expression']);
+
+// Expression texts (rate laws, function bodies) recur constantly and are
+// cheap to keep. Whole programs rarely repeat verbatim and their trees are
+// large, so program memoization is opt-in.
+let memoizedRules = new Set<MemoizableRule>(['expression']);
+
+/**
+ * Choose which entry rules memoize their results: 'prog' for
+ * parseBNGLWithANTLR's parse-tree cache, 'expression' for
+ * getExpressionDependencies. Rules left out are parsed every time and their
+ * caches are dropped on next use.
+ */
+export function setMemoizedRules(rules: Iterable<MemoizableRule>): void {
+  const next = new Set<MemoizableRule>();
+  for (const rule of rules) {
+    if (!MEMOIZABLE_RULES.has(rule)) {
+      throw new Error(`Invalid memoized rule: ${rule}. Expected one of: ${[...MEMOIZABLE_RULES].join(', ')}`);
+    }
+    next.add(rule);
+  }
+  memoizedRules = next;
+}
+
+/**
+ * Whether results for `rule` are currently memoized.
+ */
+export function isRuleMemoized(rule: MemoizableRule): boolean {
+  return memoizedRules.has(rule);
+}
+
+/**
+ * Parse `source` without building a parse tree, firing `listener`'s hooks as
+ * the parser recognizes each rule. `entry` picks the start rule (prog by
+ * default); syntax errors go to `errors` as in withParser.
+ *
+ * All enterXxx/exitXxx, enterEveryRule/exitEveryRule and visitTerminal hooks
+ * fire, in the same order as a tree walk. Contexts are never linked into a
+ * tree, so hooks must not rely on child rule contexts: on enter a context
+ * only has its start token, on exit it holds its own tokens (ctx.text, the
+ * TerminalNode accessors) and its parent, but child-rule accessors return
+ * nothing. The parse runs in a single LL pass so no hook fires twice.
+ *
+ * The source is already in memory, so tokens stay in a CommonTokenStream. An
+ * unbuffered stream would only save the token array, not the tree, and
+ * error reporting reads token ranges that it may already have dropped.
+ */
+export function parseStreaming(
+  source: string,
+  listener: BNGParserListener,
+  entry: (parser: BNGParser) => unknown = (parser) => parser.prog(),
+  errors?: ParseError[]
+): void {
+  withParser(
+    source,
+    errors,
+    (parser) => {
+      parser.buildParseTree = false;
+      parser.addParseListener(asParseListener(listener));
+      entry(parser);
+    },
+    { twoStage: false }
+  );
+}
+
+/**
+ * Parse `source` without building a parse tree, running `visitor`'s visitXxx
+ * handlers on each rule as it is recognized (see BNGLParseTreeVisitor.attach
+ * for what a handler can read). Returns the visitor.
+ */
+export function visitStreaming<V extends BNGLParseTreeVisitor<unknown>>(
+  source: string,
+  visitor: V,
+  entry: (parser: BNGParser) => unknown = (parser) => parser.prog(),
+  errors?: ParseError[]
+): V {
+  withParser(
+    source,
+    errors,
+    (parser) => {
+      visitor.attach(parser);
+      entry(parser);
+    },
+    { twoStage: false }
+  );
+  return visitor;
+}
+
+function countDFAStates(atn: ATN): number {
+  let total = 0;
+  for (const dfa of atn.decisionToDFA) total += dfa.states.size;
+  for (const dfa of atn.modeToDFA) total += dfa.states.size;
+  return total;
+}
+
+/**
+ * Number of DFA states currently cached for BNGParser and BNGLexer.
+ */
+export function getDFACacheSize(): number {
+  return countDFAStates(BNGParser._ATN) + countDFAStates(BNGLexer._ATN);
+}
+
+/**
+ * Drop the shared prediction DFA and context caches of BNGParser and BNGLexer.
+ * They are rebuilt on demand, so the next few parses run slower. Does nothing
+ * while a withParser() call is in progress (e.g. from a parse listener), since
+ * that parse may be in the middle of a prediction.
+ * @returns true if the caches were cleared
+ */
+export function clearDFACache(): boolean {
+  if (inUse) return false;
+  BNGParser._ATN.clearDFA();
+  BNGLexer._ATN.clearDFA();
+  return true;
+}
+
+/**
+ * Clear the DFA caches if they hold more than the trim threshold.
+ * Runs automatically after every withParser() call.
+ * @returns true if the caches were cleared
+ */
+export function trimDFACache(): boolean {
+  if (inUse || getDFACacheSize() <= dfaTrimThreshold) return false;
+  return clearDFACache();
+}
+
+/**
+ * Set the DFA state count above which trimDFACache() clears the caches.
+ * Pass Infinity to disable automatic trimming.
+ */
+export function setDFATrimThreshold(maxStates: number = DEFAULT_DFA_TRIM_THRESHOLD): void {
+  if (!(maxStates > 0)) {
+    throw new Error(`Invalid DFA trim threshold: ${maxStates}. Must be a positive number.`);
+  }
+  dfaTrimThreshold = maxStates;
+}
@@ -0,0 +1,267 @@
+/**
+ * services/graph/core/MoleculePatternBatch.ts
+ *
+ * Columnar (struct-of-arrays) form of a set of species/molecule patterns.
+ *
+ * Each pattern's molecules (with their compartment, tag and molecule-level
+ * bond wildcard), their components and the components' bonds are stored in flat Int32Arrays with CSR-style offset arrays, and every name is
+ * replaced by an id from the batch's name pool. Scanning many patterns for a
+ * molecule or component name then compares integers in contiguous buffers
+ * instead of walking SpeciesGraph/Molecule/Component objects.
+ */
+
+import type { ParseTree } from 'antlr4ts/tree/ParseTree.js';
+import { Token } from 'antlr4ts';
+import { ParserRuleContext } from 'antlr4ts/ParserRuleContext.js';
+import { Bond_specContext, State_valueContext } from '../../../parser/generated/BNGParser.ts';
+import type {
+  Species_defContext,
+  Molecule_patternContext,
+  Molecule_compartmentContext,
+  Component_patternContext,
+} from '../../../parser/generated/BNGParser.ts';
+import { BNGLParseTreeVisitor } from '../../../parser/BNGLParseTreeVisitor.ts';
+import { withParser } from '../../../parser/SharedParser.ts';
+import type { ParseError } from '../../../parser/BNGLParserWrapper.ts';
+
+/** State codes below zero; zero and above are state name ids. */
+export const NO_STATE = -1; // no "~state" given
+export const STATE_ANY = -2; // "~?"
+/** Bond codes below zero; zero and above are bond-label name ids. */
+export const BOND_FREE = -1; // "."
+export const BOND_BOUND = -2; // "!+"
+export const BOND_EITHER = -3; // "!?"
+/** No "@compartment" given; otherwise compartment name ids. */
+export const NO_COMPARTMENT = -1;
+/** No "%tag" given; otherwise tag name ids. */
+export const NO_TAG = -1;
+/** No molecule-level "!+" / "!?"; otherwise BOND_BOUND or BOND_EITHER. */
+export const NO_WILDCARD = -1;
+
+/**
+ * Appends the molecules and components under each visited tree to the
+ * column buffers, interning names (molecules, components, states, bond
+ * labels) into one pool as it goes.
+ */
+class PatternColumns extends BNGLParseTreeVisitor<void> {
+  readonly names: string[] = [];
+  readonly nameIds = new Map<string, number>();
+  readonly moleculeNames: number[] = [];
+  readonly moleculeCompartments: number[] = [];
+  readonly speciesCompartments: number[] = [];
+  readonly moleculeTags: number[] = [];
+  readonly moleculeWildcards: number[] = [];
+  readonly componentOffsets: number[] = [0];
+  readonly componentNames: number[] = [];
+  readonly componentStates: number[] = [];
+  readonly bondOffsets: number[] = [0];
+  readonly bonds: number[] = [];
+  // Compartment of the species_def being visited.
+  private speciesCompartment = NO_COMPARTMENT;
+
+  protected defaultResult(): void {}
+
+  private nameId(name: string): number {
+    let id = this.nameIds.get(name);
+    if (id === undefined) {
+      id = this.names.length;
+      this.names.push(name);
+      this.nameIds.set(name, id);
+    }
+    return id;
+  }
+
+  private bondCode(text: string): number {
+    if (text === '.') return BOND_FREE;
+    if (text === '!+') return BOND_BOUND;
+    if (text === '!?') return BOND_EITHER;
+    return this.nameId(text.slice(1));
+  }
+
+  visitSpecies_def(ctx: Species_defContext): void {
+    // (AT STRING COLON)? ... (AT STRING)?: an AT among the species' own
+    // children names the species compartment; a molecule's own "@comp" sits
+    // in its molecule_compartment.
+    const children = ctx.children!;
+    let compartment = NO_COMPARTMENT;
+    for (let i = 0; i + 1 < children.length; i++) {
+      const child = children[i];
+      if (!(child instanceof ParserRuleContext) && child.text === '@') {
+        compartment = this.nameId(children[i + 1].text);
+      }
+    }
+    const outer = this.speciesCompartment;
+    this.speciesCompartment = compartment;
+    this.visitChildren(ctx);
+    this.speciesCompartment = outer;
+  }
+
+  visitMolecule_compartment(ctx: Molecule_compartmentContext): void {
+    // Follows the molecule_pattern it applies to.
+    this.moleculeCompartments[this.moleculeCompartments.length - 1] = this.nameId(ctx.STRING().text);
+  }
+
+  visitMolecule_pattern(ctx: Molecule_patternContext): void {
+    if (ctx.molecule_attributes()) {
+      throw new Error(`[MoleculePatternBatch] Molecule attributes are not supported: ${ctx.text}`);
+    }
+    const wildcard = ctx.pattern_bond_wildcard();
+    const tag = ctx.molecule_tag();
+    this.moleculeNames.push(this.nameId(ctx.getChild(0).text));
+    this.moleculeCompartments.push(NO_COMPARTMENT);
+    this.speciesCompartments.push(this.speciesCompartment);
+    this.moleculeTags.push(tag ? this.nameId(tag.getChild(1).text) : NO_TAG);
+    this.moleculeWildcards.push(wildcard ? this.bondCode(wildcard.text) : NO_WILDCARD);
+    this.visitChildren(ctx);
+    this.componentOffsets.push(this.componentNames.length);
+  }
+
+  visitComponent_pattern(ctx: Component_patternContext): void {
+    // name ((TILDE state_value) | bond_spec | DOT)*
+    const children = ctx.children!;
+    let state = NO_STATE;
+    for (let i = 1; i < children.length; i++) {
+      const child = children[i];
+      if (child instanceof State_valueContext) {
+        const text = child.text;
+        state = text === '?' ? STATE_ANY : this.nameId(text);
+      } else if (child instanceof Bond_specContext) {
+        this.bonds.push(this.bondCode(child.text));
+      } else if (!(child instanceof ParserRuleContext) && child.text === '.') {
+        this.bonds.push(BOND_FREE);
+      }
+    }
+    this.componentNames.push(this.nameId(children[0].text));
+    this.componentStates.push(state);
+    this.bondOffsets.push(this.bonds.length);
+  }
+}
+
+export class MoleculePatternBatch {
+  /** Pattern p holds molecules patternOffsets[p] .. patternOffsets[p + 1] - 1. */
+  readonly patternOffsets: Int32Array;
+  /** Name id per molecule. */
+  readonly moleculeNames: Int32Array;
+  /** Compartment name id per molecule from its own "@comp", or NO_COMPARTMENT. */
+  readonly moleculeCompartments: Int32Array;
+  /** Compartment name id of the species each molecule is in, or NO_COMPARTMENT. */
+  readonly speciesCompartments: Int32Array;
+  /** Tag name id per molecule ("%1" -> "1"), or NO_TAG. */
+  readonly moleculeTags: Int32Array;
+  /** Molecule-level bond wildcard: BOND_BOUND ("!+"), BOND_EITHER ("!?") or NO_WILDCARD. */
+  readonly moleculeWildcards: Int32Array;
+  /** Molecule m holds components componentOffsets[m] .. componentOffsets[m + 1] - 1. */
+  readonly componentOffsets: Int32Array;
+  /** Name id per component. */
+  readonly componentNames: Int32Array;
+  /** State name id per component, or NO_STATE / STATE_ANY. */
+  readonly componentStates: Int32Array;
+  /** Component c holds bonds bondOffsets[c] .. bondOffsets[c + 1] - 1. */
+  readonly bondOffsets: Int32Array;
+  /** Bond-label name id, or BOND_FREE / BOND_BOUND / BOND_EITHER. */
+  readonly bonds: Int32Array;
+  /**
+   * Names indexed by the ids in the columns above. Ids are local to this
+   * batch; compare names, not ids, across batches.
+   */
+  readonly names: readonly string[];
+  private readonly nameIds: ReadonlyMap<string, number>;
+
+  private constructor(columns: PatternColumns, patternOffsets: number[]) {
+    this.patternOffsets = Int32Array.from(patternOffsets);
+    this.moleculeNames = Int32Array.from(columns.moleculeNames);
+    this.moleculeCompartments = Int32Array.from(columns.moleculeCompartments);
+    this.speciesCompartments = Int32Array.from(columns.speciesCompartments);
+    this.moleculeTags = Int32Array.from(columns.moleculeTags);
+    this.moleculeWildcards = Int32Array.from(columns.moleculeWildcards);
+    this.componentOffsets = Int32Array.from(columns.componentOffsets);
+    this.componentNames = Int32Array.from(columns.componentNames);
+    this.componentStates = Int32Array.from(columns.componentStates);
+    this.bondOffsets = Int32Array.from(columns.bondOffsets);
+    this.bonds = Int32Array.from(columns.bonds);
+    this.names = columns.names;
+    this.nameIds = columns.nameIds;
+  }
+
+  /**
+   * Build a batch from parsed subtrees, one pattern per tree: species_def
+   * contexts, or larger trees such as a rule's reactant_patterns, whose
+   * molecules then form a single pattern. Throws on molecule attributes
+   * ("A()[...]"), which have no column.
+   */
+  static fromTrees(trees: readonly ParseTree[]): MoleculePatternBatch {
+    const columns = new PatternColumns();
+    const patternOffsets = [0];
+    for (const tree of trees) {
+      columns.visit(tree);
+      patternOffsets.push(columns.moleculeNames.length);
+    }
+    return new MoleculePatternBatch(columns, patternOffsets);
+  }
+
+  /**
+   * Parse each string as a species pattern (e.g. "A(b!1,s~p).B(a!1)") and
+   * build a batch from them. Throws on syntax errors, including input left
+   * over after the pattern, naming the pattern.
+   */
+  static fromPatterns(patterns: readonly string[]): MoleculePatternBatch {
+    const trees = patterns.map((pattern) => {
+      const errors: ParseError[] = [];
+      const tree = withParser(pattern, errors, (parser): ParseTree => {
+        const ctx = parser.species_def();
+        if (parser.currentToken.type !== Token.EOF) {
+          errors.push({ line: 1, column: parser.currentToken.charPositionInLine, message: 'trailing input' });
+        }
+        return ctx;
+      });
+      if (errors.length > 0) {
+        throw new Error(`[MoleculePatternBatch] Cannot parse '${pattern}': ${errors[0].message}`);
+      }
+      return tree;
+    });
+    return MoleculePatternBatch.fromTrees(trees);
+  }
+
+  get patternCount(): number {
+    return this.patternOffsets.length - 1;
+  }
+
+  get moleculeCount(): number {
+    return this.moleculeNames.length;
+  }
+
+  /** Id of `name` in this batch's pool, or -1 if no pattern uses it. */
+  nameId(name: string): number {
+    return this.nameIds.get(name) ?? -1;
+  }
+
+  /** Name for an id stored in this batch's columns. */
+  name(id: number): string {
+    return this.names[id];
+  }
+
+  /** Index of the pattern that molecule `molecule` belongs to. */
+  patternOfMolecule(molecule: number): number {
+    const offsets = this.patternOffsets;
+    let lo = 0;
+    let hi = offsets.length - 2;
+    while (lo < hi) {
+      const mid = (lo + hi + 1) >> 1;
+      if (offsets[mid] <= molecule) lo = mid;
+      else hi = mid - 1;
+    }
+    return lo;
+  }
+
+  /** Indices of all molecules named `name`, in pattern order. */
+  moleculesNamed(name: string): Int32Array {
+    const id = this.nameId(name);
+    if (id < 0) return new Int32Array(0);
+    const names = this.moleculeNames;
+    let count = 0;
+    for (let m = 0; m < names.length; m++) if (names[m] === id) count++;
+    const out = new Int32Array(count);
+    for (let m = 0, k = 0; m < names.length; m++) if (names[m] === id) out[k++] = m;
+    return out;
+  }
+}
@@ -8,9 +8,8 @@
 import Decimal from 'decimal.js';
 import { CharStreams, CommonTokenStream } from 'antlr4ts';
 import { BNGLexer } from './../../../parser/generated/BNGLexer.ts';
-import { BNGParser, ExpressionContext, Function_callContext, Conditional_exprContext, Or_exprContext, And_exprContext, Equality_exprContext, Relational_exprContext, Additive_exprContext, Multiplicative_exprContext, Power_exprContext, Unary_exprContext, Primary_exprContext } from './../../../parser/generated/BNGParser.ts';
-import { AbstractParseTreeVisitor } from 'antlr4ts/tree/AbstractParseTreeVisitor.js';
-import type { BNGParserVisitor } from './../../../parser/generated/BNGParserVisitor.ts';
+import { BNGParser, Function_callContext, Or_exprContext, And_exprContext, Equality_exprContext, Additive_exprContext, Multiplicative_exprContext, Power_exprContext, Unary_exprContext, Primary_exprContext } from './../../../parser/generated/BNGParser.ts';
+import { BNGLParseTreeVisitor } from './../../../parser/BNGLParseTreeVisitor.ts';
 
 // Configure decimal.js
 Decimal.set({
@@ -20,6 +19,9 @@ Decimal.set({
   toExpPos: 50,
 });
 
+// Decimal values are immutable, so one zero serves every empty result.
+const ZERO = new Decimal(0);
+
 /**
  * Detect if high precision is needed
  */
@@ -43,9 +45,13 @@ export function needsHighPrecision(parameters: Map<string, number> | Record<stri
 }
 
 /**
- * Visitor to evaluate the parse tree with high precision
+ * Visitor to evaluate the parse tree with high precision.
+ * expression, conditional_expr and relational_expr are single-child wrappers;
+ * BNGLParseTreeVisitor steps through them without a handler.
  */
-class HighPrecisionVisitor extends AbstractParseTreeVisitor<Decimal> implements BNGParserVisitor<Decimal> {
+class HighPrecisionVisitor extends BNGLParseTreeVisitor<Decimal> {
+  static transparentChains = true;
+
   private parameters: Map<string, Decimal>;
   private functions: Map<string, { args: string[], expr: string }>;
 
@@ -56,54 +62,22 @@ class HighPrecisionVisitor extends AbstractParseTreeVisitor<Decimal> implements
   }
 
   protected defaultResult(): Decimal {
-    return new Decimal(0);
-  }
-
-  visitExpression(ctx: ExpressionContext): Decimal {
-    // expression: conditional_expr
-    return this.visit(ctx.conditional_expr());
-  }
-
-  visitConditional_expr(ctx: Conditional_exprContext): Decimal {
-    // grammar now simplifies conditional_expr -> or_expr (no ternary operator)
-    // just evaluate the subexpression
-    return this.visit(ctx.or_expr());
+    return ZERO;
   }
 
   visitOr_expr(ctx: Or_exprContext): Decimal {
-    let result = this.visit(ctx.and_expr(0));
-    for (let i = 1; i < ctx.and_expr().length; i++) {
-      const next = this.visit(ctx.and_expr(i));
-      // Logical OR: if either is non-zero, return 1, else 0
-      const val = (!result.isZero() || !next.isZero()) ? 1 : 0;
-      result = new Decimal(val);
-    }
-    return result;
+    // Logical OR: if either is non-zero, return 1, else 0
+    return this.foldChain(ctx, (left, _op, right) => new Decimal((!left.isZero() || !right.isZero()) ? 1 : 0));
   }
 
   visitAnd_expr(ctx: And_exprContext): Decimal {
-    let result = this.visit(ctx.equality_expr(0));
-    for (let i = 1; i < ctx.equality_expr().length; i++) {
-      const next = this.visit(ctx.equality_expr(i));
-      // Logical AND: if both are non-zero, return 1, else 0
-      const val = (!result.isZero() && !next.isZero()) ? 1 : 0;
-      result = new Decimal(val);
-    }
-    return result;
+    // Logical AND: if both are non-zero, return 1, else 0
+    return this.foldChain(ctx, (left, _op, right) => new Decimal((!left.isZero() && !right.isZero()) ? 1 : 0));
   }
 
   visitEquality_expr(ctx: Equality_exprContext): Decimal {
-    let left = this.visit(ctx.relational_expr(0));
-    // Determine operators. The structure is relational_expr (OP relational_expr)*
-    // We iterate children to find operators
-    for (let i = 1; i < ctx.relational_expr().length; i++) {
-      const right = this.visit(ctx.relational_expr(i));
-      // Find the operator between i-1 and i
-      // It's the child at index (i-1)*2 + 1
-      const opNode = ctx.getChild((i - 1) * 2 + 1);
-      const op = opNode.text;
-
-      // EQUALS | NOT_EQUALS | GTE | GT | LTE | LT
+    // EQUALS | NOT_EQUALS | GTE | GT | LTE | LT
+    return this.foldChain(ctx, (left, op, right) => {
       let val = false;
       switch (op) {
         case '==': val = left.equals(right); break;
@@ -113,52 +87,31 @@ class HighPrecisionVisitor extends AbstractParseTreeVisitor<Decimal> implements
         case '<=': val = left.lessThanOrEqualTo(right); break;
         case '<': val = left.lessThan(right); break;
       }
-      left = new Decimal(val ? 1 : 0);
-    }
-    return left;
-  }
-
-  visitRelational_expr(ctx: Relational_exprContext): Decimal {
-    return this.visit(ctx.additive_expr());
+      return new Decimal(val ? 1 : 0);
+    });
   }
 
   visitAdditive_expr(ctx: Additive_exprContext): Decimal {
-    let left = this.visit(ctx.multiplicative_expr(0));
-    for (let i = 1; i < ctx.multiplicative_expr().length; i++) {
-      const right = this.visit(ctx.multiplicative_expr(i));
-      const op = ctx.getChild((i - 1) * 2 + 1).text;
-      if (op === '+') left = left.plus(right);
-      else if (op === '-') left = left.minus(right);
-    }
-    return left;
+    return this.foldChain(ctx, (left, op, right) => {
+      if (op === '+') return left.plus(right);
+      if (op === '-') return left.minus(right);
+      return left;
+    });
   }
 
   visitMultiplicative_expr(ctx: Multiplicative_exprContext): Decimal {
-    let left = this.visit(ctx.power_expr(0));
-    for (let i = 1; i < ctx.power_expr().length; i++) {
-      const right = this.visit(ctx.power_expr(i));
-      const op = ctx.getChild((i - 1) * 2 + 1).text;
-      if (op === '*') left = left.times(right);
-      else if (op === '/') left = left.dividedBy(right);
-      else if (op === '%') left = left.mod(right);
-    }
-    return left;
+    return this.foldChain(ctx, (left, op, right) => {
+      if (op === '*') return left.times(right);
+      if (op === '/') return left.dividedBy(right);
+      if (op === '%') return left.mod(right);
+      return left;
+    });
   }
 
   visitPower_expr(ctx: Power_exprContext): Decimal {
-    const unarys = ctx.unary_expr();
-    let base = this.visit(unarys[0]);
-    // Right associative power? BNGParser.g4 says: unary_expr (POWER unary_expr)*
-    // Standard precedence usually implies right associativity for power, but generated parser iterates loop.
-    // Usually standard math is right associative: 2^3^4 = 2^(3^4).
-    // If the grammar is (POWER unary_expr)*, strict iteration is (a^b)^c.
-    // Let's implement left associative for now to match the loop structure, or check spec. 
-    // Most BNG models use parenthesis for ambiguity.
-    for (let i = 1; i < unarys.length; i++) {
-      const exponent = this.visit(unarys[i]);
-      base = base.pow(exponent);
-    }
-    return base;
+    // unary_expr (POWER unary_expr)* is iterated by the generated parser, so
+    // a^b^c evaluates as (a^b)^c. Most BNG models use parentheses for ambiguity.
+    return this.foldChain(ctx, (base, _op, exponent) => base.pow(exponent));
   }
 
   visitUnary_expr(ctx: Unary_exprContext): Decimal {
@@ -179,17 +132,22 @@ class HighPrecisionVisitor extends AbstractParseTreeVisitor<Decimal> implements
       if (txt === 'EULERIAN') return new Decimal(1).exp();
       return new Decimal(txt);
     }
-    if (ctx.observable_ref()) {
+    const ref = ctx.observable_ref();
+    if (ref) {
+      // User functions have no token of their own, so f(x) parses as an
+      // observable_ref with an argument list.
+      const name = ref.STRING().text;
+      const exprList = ref.expression_list();
+      if (exprList && this.functions.has(name)) {
+        return this.callFunction(name, exprList.expression().map((expr) => this.visit(expr)));
+      }
       // observables are treated as 1.0 (or looked up if passed as params) during rate eval
       // In params map, they might be present.
-      // Observable ref syntax: Name(args)
-      // We just take the name part probably.
-      const name = ctx.observable_ref()!.text.split('(')[0];
       if (this.parameters.has(name)) return this.parameters.get(name)!;
       // If not in parameters, it might be a valid observable not yet computed?
       // Since this is for initial param evaluation, missing observable = 0 or 1?
       // Fallback:
-      return new Decimal(0);
+      return ZERO;
     }
     if (ctx.function_call()) {
       return this.visitFunction_call(ctx.function_call()!);
@@ -214,7 +172,7 @@ class HighPrecisionVisitor extends AbstractParseTreeVisitor<Decimal> implements
       throw new Error(`Unknown identifier: ${name}`);
     }
     // Should not happen
-    return new Decimal(0);
+    return ZERO;
   }
 
   visitFunction_call(ctx: Function_callContext): Decimal {
@@ -229,24 +187,11 @@ class HighPrecisionVisitor extends AbstractParseTreeVisitor<Decimal> implements
       }
     }
 
-    const arg = args.length > 0 ? args[0] : new Decimal(0);
+    const arg = args.length > 0 ? args[0] : ZERO;
 
     // Check for custom functions
     if (this.functions.has(funcName)) {
-      const funcDef = this.functions.get(funcName)!;
-      if (funcDef.args.length !== args.length) {
-        throw new Error(`Function ${funcName} expects ${funcDef.args.length} arguments, got ${args.length}`);
-      }
-
-      // Evaluate custom function body with arguments mapped
-      // We create a new parameter scope inheriting globals but overriding args
-      const localParams = new Map(this.parameters);
-      for (let i = 0; i < args.length; i++) {
-        localParams.set(funcDef.args[i], args[i]);
-      }
-
-      // Recursive evaluation
-      return new Decimal(evaluateExpressionHighPrecision(funcDef.expr, localParams, this.functions));
+      return this.callFunction(funcName, args);
     }
 
     switch (funcLower) {
@@ -286,6 +231,23 @@ class HighPrecisionVisitor extends AbstractParseTreeVisitor<Decimal> implements
     }
   }
 
+  private callFunction(funcName: string, args: Decimal[]): Decimal {
+    const funcDef = this.functions.get(funcName)!;
+    if (funcDef.args.length !== args.length) {
+      throw new Error(`Function ${funcName} expects ${funcDef.args.length} arguments, got ${args.length}`);
+    }
+
+    // Evaluate custom function body with arguments mapped
+    // We create a new parameter scope inheriting globals but overriding args
+    const localParams = new Map(this.parameters);
+    for (let i = 0; i < args.length; i++) {
+      localParams.set(funcDef.args[i], args[i]);
+    }
+
+    // Recursive evaluation
+    return new Decimal(evaluateExpressionHighPrecision(funcDef.expr, localParams, this.functions));
+  }
+
   private mratio(a: Decimal, b: Decimal, z: Decimal): Decimal {
     const eps = new Decimal(1e-16);
     const tiny = new Decimal(1e-32);
@@ -15,6 +15,7 @@ import { getExpressionDependencies } from '../../parser/ExpressionDependencies';
 import { GraphMatcher } from '../graph/core/Matcher';
 import { countEmbeddingDegeneracy } from '../graph/core/degeneracy';
 import { registerCacheClearCallback } from '../../featureFlags';
+import { setBoundedCache } from '../../utils/boundedCache';
 
 const factorial = (n: number): number => {
     if (!Number.isFinite(n) || n <= 1) return 1;
@@ -106,19 +107,6 @@ const parsedGraphCache = new Map<string, ReturnType<typeof BNGLParser.parseSpeci
 const MAX_PARSED_GRAPH_CACHE = 1000;
 let PARSED_GRAPH_CACHE_VERSION = '1.0.0';
 
-const setBoundedCache = <K, V>(cache: Map<K, V>, key: K, value: V, maxSize: number): void => {
-    if (maxSize <= 0) return;
-    // Refresh insertion order (Map preserves insertion order, so delete+set moves to end)
-    cache.delete(key);
-    cache.set(key, value);
-    if (cache.size > maxSize) {
-        const oldestKey = cache.keys().next().value;
-        if (oldestKey !== undefined) {
-            cache.delete(oldestKey);
-        }
-    }
-};
-
 export function parseGraphCached(str: string) {
     const cacheKey = `${PARSED_GRAPH_CACHE_VERSION}::${str}`;
     const cached = parsedGraphCache.get(cacheKey);
@@ -0,0 +1,384 @@
+/**
+ * services/simulation/ExpressionBatch.ts
+ *
+ * Compiles a set of BNGL expressions (rate laws, functions) into one flat,
+ * struct-of-arrays stack program and evaluates all of them in a single sweep.
+ *
+ * Every instruction of every expression lives in the same typed arrays
+ * (opcode[], operand[]) with a shared constant pool, so re-evaluating the whole
+ * set for new parameter/observable values touches a few contiguous buffers
+ * instead of walking one parse tree or closure graph per expression.
+ */
+
+import { Token } from 'antlr4ts';
+import type { ParserRuleContext } from 'antlr4ts/ParserRuleContext.js';
+import type { ParseTree } from 'antlr4ts/tree/ParseTree.js';
+import type {
+  Or_exprContext,
+  And_exprContext,
+  Equality_exprContext,
+  Additive_exprContext,
+  Multiplicative_exprContext,
+  Power_exprContext,
+  Unary_exprContext,
+  Primary_exprContext,
+  Function_callContext,
+  Observable_refContext,
+  Arg_nameContext,
+  LiteralContext,
+} from '../../parser/generated/BNGParser.ts';
+import { BNGLParseTreeVisitor } from '../../parser/BNGLParseTreeVisitor.ts';
+import { withParser } from '../../parser/SharedParser.ts';
+import type { ParseError } from '../../parser/BNGLParserWrapper.ts';
+
+export enum BatchOp {
+  CONST = 0, // push constants[operand]
+  VAR = 1, // push values[operand]
+  ADD = 2,
+  SUB = 3,
+  MUL = 4,
+  DIV = 5,
+  MOD = 6,
+  POW = 7,
+  NEG = 8,
+  NOT = 9,
+  EQ = 10,
+  NE = 11,
+  LT = 12,
+  LE = 13,
+  GT = 14,
+  GE = 15,
+  AND = 16,
+  OR = 17,
+  IF = 18, // cond, then, else -> then or else
+  MIN = 19, // operand = argument count
+  MAX = 20, // operand = argument count
+  CALL1 = 21, // operand = index into UNARY_FUNCTIONS
+}
+
+// Round half to even, matching BNG2's rint() and the high-precision evaluator.
+function rint(x: number): number {
+  const r = Math.round(x);
+  return Math.abs(x % 1) === 0.5 && r % 2 !== 0 ? r - 1 : r;
+}
+
+const UNARY_FUNCTIONS: ReadonlyArray<readonly [string, (x: number) => number]> = [
+  ['exp', Math.exp],
+  ['ln', Math.log],
+  ['log', Math.log],
+  ['log10', Math.log10],
+  ['log2', Math.log2],
+  ['sqrt', Math.sqrt],
+  ['abs', Math.abs],
+  ['sin', Math.sin],
+  ['cos', Math.cos],
+  ['tan', Math.tan],
+  ['asin', Math.asin],
+  ['acos', Math.acos],
+  ['atan', Math.atan],
+  ['sinh', Math.sinh],
+  ['cosh', Math.cosh],
+  ['tanh', Math.tanh],
+  ['asinh', Math.asinh],
+  ['acosh', Math.acosh],
+  ['atanh', Math.atanh],
+  ['rint', rint],
+];
+const UNARY_IMPLS = UNARY_FUNCTIONS.map(([, fn]) => fn);
+const UNARY_INDEX = new Map(UNARY_FUNCTIONS.map(([name], i) => [name, i]));
+
+const BINARY_OPS: Readonly<Record<string, BatchOp>> = {
+  '+': BatchOp.ADD,
+  '-': BatchOp.SUB,
+  '*': BatchOp.MUL,
+  '/': BatchOp.DIV,
+  '%': BatchOp.MOD,
+  '==': BatchOp.EQ,
+  '!=': BatchOp.NE,
+  '~=': BatchOp.NE,
+  '<': BatchOp.LT,
+  '<=': BatchOp.LE,
+  '>': BatchOp.GT,
+  '>=': BatchOp.GE,
+};
+
+/**
+ * Emits stack code for one expression parse tree into the shared buffers.
+ */
+class BatchEmitter extends BNGLParseTreeVisitor<void> {
+  static transparentChains = true;
+
+  readonly ops: number[] = [];
+  readonly operands: number[] = [];
+  readonly constants: number[] = [];
+  private readonly constantIndex = new Map<number, number>();
+  private depth = 0;
+  maxDepth = 0;
+
+  constructor(private readonly variables: ReadonlyMap<string, number>) {
+    super();
+  }
+
+  protected defaultResult(): void {}
+
+  /** Reset the depth tracking before the next expression. */
+  begin(): void {
+    this.depth = 0;
+  }
+
+  private emit(op: BatchOp, operand: number, stackEffect: number): void {
+    this.ops.push(op);
+    this.operands.push(operand);
+    this.depth += stackEffect;
+    if (this.depth > this.maxDepth) this.maxDepth = this.depth;
+  }
+
+  private emitConstant(value: number): void {
+    let index = this.constantIndex.get(value);
+    if (index === undefined) {
+      index = this.constants.length;
+      this.constants.push(value);
+      this.constantIndex.set(value, index);
+    }
+    this.emit(BatchOp.CONST, index, 1);
+  }
+
+  private emitVariable(name: string): void {
+    const slot = this.variables.get(name);
+    if (slot === undefined) throw new Error(`Unknown identifier: ${name}`);
+    this.emit(BatchOp.VAR, slot, 1);
+  }
+
+  // Each operand is emitted by foldChain's visit; the operator follows it.
+  private emitChain(ctx: ParserRuleContext, fixedOp?: BatchOp): void {
+    this.foldChain(ctx, (_left, op) => this.emit(fixedOp ?? BINARY_OPS[op], 0, -1));
+  }
+
+  visitOr_expr(ctx: Or_exprContext): void {
+    this.emitChain(ctx, BatchOp.OR);
+  }
+
+  visitAnd_expr(ctx: And_exprContext): void {
+    this.emitChain(ctx, BatchOp.AND);
+  }
+
+  visitEquality_expr(ctx: Equality_exprContext): void {
+    this.emitChain(ctx);
+  }
+
+  visitAdditive_expr(ctx: Additive_exprContext): void {
+    this.emitChain(ctx);
+  }
+
+  visitMultiplicative_expr(ctx: Multiplicative_exprContext): void {
+    this.emitChain(ctx);
+  }
+
+  visitPower_expr(ctx: Power_exprContext): void {
+    // Left-associative, as the grammar's loop and the other evaluators read it.
+    this.emitChain(ctx, BatchOp.POW);
+  }
+
+  visitUnary_expr(ctx: Unary_exprContext): void {
+    const children = ctx.children!;
+    this.visit(children[children.length - 1]);
+    if (children.length > 1) {
+      const op = children[0].text;
+      if (op === '-') this.emit(BatchOp.NEG, 0, 0);
+      else if (op === '!' || op === '~') this.emit(BatchOp.NOT, 0, 0);
+    }
+  }
+
+  visitPrimary_expr(ctx: Primary_exprContext): void {
+    const children = ctx.children!;
+    // LPAREN expression RPAREN, or a single function_call/observable_ref/literal/arg_name.
+    this.visit(children.length === 3 ? children[1] : children[0]);
+  }
+
+  visitLiteral(ctx: LiteralContext): void {
+    const text = ctx.text;
+    if (text === '_pi') this.emitConstant(Math.PI);
+    else if (text === '_e') this.emitConstant(Math.E);
+    else this.emitConstant(Number(text));
+  }
+
+  visitArg_name(ctx: Arg_nameContext): void {
+    this.emitVariable(ctx.text);
+  }
+
+  visitObservable_ref(ctx: Observable_refContext): void {
+    // Name() reads the observable/function value. With arguments it is either
+    // a builtin without its own token (log) or a user function, which must be
+    // expanded before compiling.
+    const name = ctx.STRING().text;
+    const list = ctx.expression_list();
+    if (!list) {
+      this.emitVariable(name);
+      return;
+    }
+    const args = list.expression();
+    const unary = UNARY_INDEX.get(name.toLowerCase());
+    if (unary === undefined || args.length !== 1) {
+      throw new Error(`Unsupported call with arguments: ${ctx.text}`);
+    }
+    this.visit(args[0]);
+    this.emit(BatchOp.CALL1, unary, 0);
+  }
+
+  visitFunction_call(ctx: Function_callContext): void {
+    const name = ctx.getChild(0).text.toLowerCase();
+    const list = ctx.expression_list();
+    const args = list ? list.expression() : [];
+    for (const arg of args) this.visit(arg);
+
+    const unary = UNARY_INDEX.get(name);
+    if (unary !== undefined && args.length === 1) {
+      this.emit(BatchOp.CALL1, unary, 0);
+    } else if (name === 'if' && args.length === 3) {
+      this.emit(BatchOp.IF, 0, -2);
+    } else if ((name === 'min' || name === 'max') && args.length > 0) {
+      this.emit(name === 'min' ? BatchOp.MIN : BatchOp.MAX, args.length, 1 - args.length);
+    } else if (name === 'time' && args.length === 0) {
+      // The simulation time is passed in like any other value.
+      this.emitVariable('time');
+    } else {
+      throw new Error(`Unsupported function: ${ctx.getChild(0).text}/${args.length}`);
+    }
+  }
+}
+
+/**
+ * A compiled set of expressions sharing one flat program.
+ */
+export class ExpressionBatch {
+  /** Opcode per instruction, for all expressions back to back. */
+  readonly ops: Int32Array;
+  /** Operand per instruction (constant index, variable slot or argument count). */
+  readonly operands: Int32Array;
+  readonly constants: Float64Array;
+  /** Expression i spans instructions starts[i] .. starts[i + 1] - 1. */
+  readonly starts: Int32Array;
+  private readonly stack: Float64Array;
+
+  private constructor(emitter: BatchEmitter, starts: number[]) {
+    this.ops = Int32Array.from(emitter.ops);
+    this.operands = Int32Array.from(emitter.operands);
+    this.constants = Float64Array.from(emitter.constants);
+    this.starts = Int32Array.from(starts);
+    this.stack = new Float64Array(Math.max(emitter.maxDepth, 1));
+  }
+
+  /**
+   * Compile `expressions` against `variables` (name -> index into the values
+   * array passed to evaluateAll). time() reads the slot named 'time'. Throws
+   * on syntax errors, unknown identifiers and functions the batch evaluator
+   * does not implement, naming the offending expression.
+   */
+  static compile(expressions: readonly string[], variables: ReadonlyMap<string, number>): ExpressionBatch {
+    return ExpressionBatch.assemble(expressions, variables, (expression) => expression, (expression) => {
+      const errors: ParseError[] = [];
+      const tree = withParser(expression, errors, (parser): ParseTree => {
+        const ctx = parser.expression();
+        if (parser.currentToken.type !== Token.EOF) {
+          errors.push({ line: 1, column: parser.currentToken.charPositionInLine, message: 'trailing input' });
+        }
+        return ctx;
+      });
+      if (errors.length > 0) throw new Error(errors[0].message);
+      return tree;
+    });
+  }
+
+  /**
+   * Compile expression subtrees that are already parsed, e.g. the expression
+   * contexts of a model's parse tree, without going back through the parser.
+   * Errors are reported as in compile(), using the subtree's text.
+   */
+  static fromTrees(trees: readonly ParseTree[], variables: ReadonlyMap<string, number>): ExpressionBatch {
+    return ExpressionBatch.assemble(trees, variables, (tree) => tree.text, (tree) => tree);
+  }
+
+  private static assemble<T>(
+    items: readonly T[],
+    variables: ReadonlyMap<string, number>,
+    describe: (item: T) => string,
+    toTree: (item: T) => ParseTree
+  ): ExpressionBatch {
+    const emitter = new BatchEmitter(variables);
+    const starts: number[] = [];
+    for (const item of items) {
+      starts.push(emitter.ops.length);
+      emitter.begin();
+      try {
+        emitter.visit(toTree(item));
+      } catch (e) {
+        const message = e instanceof Error ? e.message : String(e);
+        throw new Error(`[ExpressionBatch] Cannot compile '${describe(item)}': ${message}`);
+      }
+    }
+    starts.push(emitter.ops.length);
+    return new ExpressionBatch(emitter, starts);
+  }
+
+  get size(): number {
+    return this.starts.length - 1;
+  }
+
+  /**
+   * Evaluate every expression for the given variable values.
+   * @param values - values indexed by the slots given to compile()
+   * @param out - optional output buffer of at least `size` entries
+   */
+  evaluateAll(values: ArrayLike<number>, out: Float64Array = new Float64Array(this.size)): Float64Array {
+    const { ops, operands, constants, starts, stack } = this;
+    const n = this.size;
+    let pc = 0;
+    for (let e = 0; e < n; e++) {
+      const end = starts[e + 1];
+      let sp = -1;
+      for (; pc < end; pc++) {
+        const operand = operands[pc];
+        switch (ops[pc]) {
+          case BatchOp.CONST: stack[++sp] = constants[operand]; break;
+          case BatchOp.VAR: stack[++sp] = values[operand]; break;
+          case BatchOp.ADD: stack[sp - 1] += stack[sp]; sp--; break;
+          case BatchOp.SUB: stack[sp - 1] -= stack[sp]; sp--; break;
+          case BatchOp.MUL: stack[sp - 1] *= stack[sp]; sp--; break;
+          case BatchOp.DIV: stack[sp - 1] /= stack[sp]; sp--; break;
+          case BatchOp.MOD: stack[sp - 1] %= stack[sp]; sp--; break;
+          case BatchOp.POW: stack[sp - 1] = Math.pow(stack[sp - 1], stack[sp]); sp--; break;
+          case BatchOp.NEG: stack[sp] = -stack[sp]; break;
+          case BatchOp.NOT: stack[sp] = stack[sp] === 0 ? 1 : 0; break;
+          case BatchOp.EQ: stack[sp - 1] = stack[sp - 1] === stack[sp] ? 1 : 0; sp--; break;
+          case BatchOp.NE: stack[sp - 1] = stack[sp - 1] !== stack[sp] ? 1 : 0; sp--; break;
+          case BatchOp.LT: stack[sp - 1] = stack[sp - 1] < stack[sp] ? 1 : 0; sp--; break;
+          case BatchOp.LE: stack[sp - 1] = stack[sp - 1] <= stack[sp] ? 1 : 0; sp--; break;
+          case BatchOp.GT: stack[sp - 1] = stack[sp - 1] > stack[sp] ? 1 : 0; sp--; break;
+          case BatchOp.GE: stack[sp - 1] = stack[sp - 1] >= stack[sp] ? 1 : 0; sp--; break;
+          case BatchOp.AND: stack[sp - 1] = stack[sp - 1] !== 0 && stack[sp] !== 0 ? 1 : 0; sp--; break;
+          case BatchOp.OR: stack[sp - 1] = stack[sp - 1] !== 0 || stack[sp] !== 0 ? 1 : 0; sp--; break;
+          case BatchOp.IF: sp -= 2; stack[sp] = stack[sp] !== 0 ? stack[sp + 1] : stack[sp + 2]; break;
+          case BatchOp.MIN: {
+            const base = sp - operand + 1;
+            let m = stack[base];
+            for (let i = base + 1; i <= sp; i++) if (stack[i] < m) m = stack[i];
+            sp = base;
+            stack[sp] = m;
+            break;
+          }
+          case BatchOp.MAX: {
+            const base = sp - operand + 1;
+            let m = stack[base];
+            for (let i = base + 1; i <= sp; i++) if (stack[i] > m) m = stack[i];
+            sp = base;
+            stack[sp] = m;
+            break;
+          }
+          case BatchOp.CALL1: stack[sp] = UNARY_IMPLS[operand](stack[sp]); break;
+        }
+      }
+      out[e] = sp === 0 ? stack[0] : NaN;
+    }
+    return out;
+  }
+}
@@ -6,6 +6,7 @@
  */
 
 import { getFeatureFlags, registerCacheClearCallback } from '../../featureFlags';
+import { setBoundedCache } from '../../utils/boundedCache';
 // console.log("ExpressionEvaluator module loaded");
 
 /**
@@ -134,14 +135,6 @@ function fnv1aHash(str: string): string {
   return hash.toString(16).padStart(8, '0');
 }
 
-function setBoundedCache<K, V>(map: Map<K, V>, key: K, value: V, maxSize: number) {
-  if (map.size >= maxSize) {
-    const first = map.keys().next().value;
-    if (first !== undefined) map.delete(first);
-  }
-  map.set(key, value);
-}
-
 function bumpPatchVersion(v: string): string {
   const parts = v.split('.').map((p) => parseInt(p, 10));
   if (parts.length !== 3 || parts.some((n) => Number.isNaN(n))) return v;
@@ -0,0 +1,34 @@
+/**
+ * utils/boundedCache.ts
+ *
+ * Helpers for the size-capped Map caches used across the engine. A Map keeps
+ * insertion order, so its first key is always the entry that was stored (or,
+ * through getBoundedCache, read) longest ago, and is the one evicted.
+ */
+
+/**
+ * Store `value` under `key`, moving the key to the most recent position, and
+ * evict the oldest entry once the cache holds more than `maxSize` entries.
+ */
+export function setBoundedCache<K, V>(cache: Map<K, V>, key: K, value: V, maxSize: number): void {
+  if (maxSize <= 0) return;
+  cache.delete(key);
+  cache.set(key, value);
+  if (cache.size > maxSize) {
+    const oldestKey = cache.keys().next().value;
+    if (oldestKey !== undefined) cache.delete(oldestKey);
+  }
+}
+
+/**
+ * Look up `key` and, on a hit, mark it as most recently used so that
+ * setBoundedCache evicts it last.
+ */
+export function getBoundedCache<K, V>(cache: Map<K, V>, key: K): V | undefined {
+  const value = cache.get(key);
+  if (value !== undefined) {
+    cache.delete(key);
+    cache.set(key, value);
+  }
+  return value;
+}
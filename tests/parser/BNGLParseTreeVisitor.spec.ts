@@ -0,0 +1,284 @@
+import { describe, it, expect } from 'vitest';
+import { CharStreams, CommonTokenStream } from 'antlr4ts';
+import type { RuleNode } from 'antlr4ts/tree/RuleNode';
+import type { ParseTree } from 'antlr4ts/tree/ParseTree';
+import type { TerminalNode } from 'antlr4ts/tree/TerminalNode';
+import { ParserRuleContext } from 'antlr4ts/ParserRuleContext';
+import { BNGLexer } from '../../packages/engine/src/parser/generated/BNGLexer';
+import {
+  BNGParser,
+  type Additive_exprContext,
+  type LiteralContext,
+  type Arg_nameContext,
+} from '../../packages/engine/src/parser/generated/BNGParser';
+import { BNGLParseTreeVisitor } from '../../packages/engine/src/parser/BNGLParseTreeVisitor';
+
+function parseExpression(src: string) {
+  const parser = new BNGParser(new CommonTokenStream(new BNGLexer(CharStreams.fromString(src))));
+  parser.removeErrorListeners();
+  return parser.expression();
+}
+
+class SumVisitor extends BNGLParseTreeVisitor<number> {
+  protected defaultResult(): number {
+    return 0;
+  }
+
+  visitAdditive_expr(ctx: Additive_exprContext): number {
+    return ctx.multiplicative_expr().reduce((sum, term) => sum + this.visit(term), 0);
+  }
+
+  visitLiteral(ctx: LiteralContext): number {
+    return Number(ctx.text);
+  }
+}
+
+describe('BNGLParseTreeVisitor', () => {
+  it('dispatches visitXxx handlers through the expression ladder', () => {
+    expect(new SumVisitor().visit(parseExpression('1 + 2 + 3'))).toBe(6);
+  });
+
+  it('keeps every level when the subclass customises aggregation', () => {
+    class NameCollector extends BNGLParseTreeVisitor<string[]> {
+      visitedChildren = 0;
+
+      protected defaultResult(): string[] {
+        return [];
+      }
+
+      protected aggregateResult(aggregate: string[], next: string[]): string[] {
+        return aggregate.concat(next);
+      }
+
+      visitChildren(node: RuleNode): string[] {
+        this.visitedChildren++;
+        return super.visitChildren(node);
+      }
+
+      visitArg_name(ctx: Arg_nameContext): string[] {
+        return [ctx.text];
+      }
+    }
+    const collector = new NameCollector();
+
+    expect(collector.visit(parseExpression('k1*A + t_end'))).toEqual(['k1', 'A', 't_end']);
+    expect(collector.visitedChildren).toBeGreaterThan(10);
+  });
+
+  it('returns the last child result under the default aggregation', () => {
+    class LastLiteral extends BNGLParseTreeVisitor<number> {
+      protected defaultResult(): number {
+        return -1;
+      }
+
+      visitLiteral(ctx: LiteralContext): number {
+        return Number(ctx.text);
+      }
+    }
+
+    expect(new LastLiteral().visit(parseExpression('1 + 2'))).toBe(2);
+    expect(new LastLiteral().visit(parseExpression('(1)'))).toBe(-1);
+  });
+
+  it('still visits tokens when visitTerminal is overridden', () => {
+    class TokenCollector extends BNGLParseTreeVisitor<void> {
+      tokens: string[] = [];
+
+      protected defaultResult(): void {}
+
+      visitTerminal(node: TerminalNode): void {
+        this.tokens.push(node.text);
+      }
+    }
+    const collector = new TokenCollector();
+
+    collector.visit(parseExpression('1 + (2)'));
+
+    expect(collector.tokens).toEqual(['1', '+', '(', '2', ')']);
+  });
+
+  it('routes visitChildren through the handler table', () => {
+    class LiteralCounter extends BNGLParseTreeVisitor<void> {
+      literals: string[] = [];
+
+      protected defaultResult(): void {}
+
+      visitLiteral(ctx: LiteralContext): void {
+        this.literals.push(ctx.text);
+      }
+    }
+    const counter = new LiteralCounter();
+
+    counter.visit(parseExpression('max(1, k*2) + (3 - f(4))'));
+
+    expect(counter.literals).toEqual(['1', '2', '3', '4']);
+  });
+
+  it('memoizes opted-in rules within one top-level visit', () => {
+    class DoublingVisitor extends BNGLParseTreeVisitor<number> {
+      literalCalls = 0;
+
+      constructor() {
+        super();
+        this.memoizeRules(BNGParser.RULE_literal);
+      }
+
+      protected defaultResult(): number {
+        return 0;
+      }
+
+      visitAdditive_expr(ctx: Additive_exprContext): number {
+        // Visits every term twice.
+        return ctx.multiplicative_expr().reduce((sum, term) => sum + this.visit(term) + this.visit(term), 0);
+      }
+
+      visitLiteral(ctx: LiteralContext): number {
+        this.literalCalls++;
+        return Number(ctx.text);
+      }
+    }
+    const visitor = new DoublingVisitor();
+    const tree = parseExpression('1 + 2');
+
+    expect(visitor.visit(tree)).toBe(6);
+    expect(visitor.literalCalls).toBe(2);
+
+    visitor.visit(tree);
+    expect(visitor.literalCalls).toBe(4);
+  });
+
+  it('runs handlers children-first in visitPostOrder', () => {
+    class Trace extends BNGLParseTreeVisitor<void> {
+      trace: string[] = [];
+
+      protected defaultResult(): void {}
+
+      visitAdditive_expr(ctx: Additive_exprContext): void {
+        this.trace.push(`add:${ctx.childCount}`);
+      }
+
+      visitLiteral(ctx: LiteralContext): void {
+        this.trace.push(ctx.text);
+      }
+
+      visitArg_name(ctx: Arg_nameContext): void {
+        this.trace.push(ctx.text);
+      }
+    }
+    const visitor = new Trace();
+
+    visitor.visitPostOrder(parseExpression('1 + k*(2 - 3)'));
+
+    expect(visitor.trace).toEqual(['1', 'k', '2', '3', 'add:3', 'add:3']);
+  });
+
+  it('replays a recorded post-order plan on reuse walks', () => {
+    class Names extends BNGLParseTreeVisitor<void> {
+      names: string[] = [];
+
+      protected defaultResult(): void {}
+
+      visitArg_name(ctx: Arg_nameContext): void {
+        this.names.push(ctx.text);
+      }
+    }
+    const tree = parseExpression('a + f(b, c*d)');
+    const first = new Names();
+    first.visitPostOrder(tree, { reuse: true });
+
+    // The second walk replays the plan instead of reading the tree's children.
+    const children = tree.children;
+    tree.children = undefined;
+    const second = new Names();
+    second.visitPostOrder(tree, { reuse: true });
+    tree.children = children;
+
+    expect(first.names).toEqual(['a', 'b', 'c', 'd']);
+    expect(second.names).toEqual(first.names);
+  });
+
+  it('skips handled single-child levels for transparentChains visitors', () => {
+    class Evaluator extends BNGLParseTreeVisitor<number> {
+      static transparentChains = true;
+      additiveCalls = 0;
+
+      protected defaultResult(): number {
+        return 0;
+      }
+
+      visitAdditive_expr(ctx: Additive_exprContext): number {
+        this.additiveCalls++;
+        return ctx.multiplicative_expr().reduce((sum, term) => sum + this.visit(term), 0);
+      }
+
+      visitLiteral(ctx: LiteralContext): number {
+        return Number(ctx.text);
+      }
+    }
+    const evaluator = new Evaluator();
+
+    expect(evaluator.visit(parseExpression('5'))).toBe(5);
+    expect(evaluator.additiveCalls).toBe(0);
+    expect(evaluator.visit(parseExpression('1 + 2 + 3'))).toBe(6);
+    expect(evaluator.additiveCalls).toBe(1);
+  });
+
+  it('folds operator chains left to right', () => {
+    class Difference extends BNGLParseTreeVisitor<number> {
+      static transparentChains = true;
+
+      protected defaultResult(): number {
+        return 0;
+      }
+
+      visitAdditive_expr(ctx: Additive_exprContext): number {
+        return this.foldChain(ctx, (left, op, right) => (op === '-' ? left - right : left + right));
+      }
+
+      visitLiteral(ctx: LiteralContext): number {
+        return Number(ctx.text);
+      }
+    }
+
+    expect(new Difference().visit(parseExpression('10 - 3 - 2 + 1'))).toBe(6);
+  });
+
+  it('caches context text across a node and its descendants', () => {
+    class TextReader extends BNGLParseTreeVisitor<string> {
+      protected defaultResult(): string {
+        return '';
+      }
+
+      read(tree: ParseTree): string {
+        return this.textOf(tree);
+      }
+    }
+    const tree = parseExpression('f(a, 2) * (b - 1)');
+    const reader = new TextReader();
+
+    expect(reader.read(tree)).toBe(tree.text);
+    const child = tree.getChild(0);
+    expect(reader.read(child)).toBe(child.text);
+    expect(reader.read(tree)).toBe('f(a,2)*(b-1)');
+  });
+
+  it('reads the text of trees deeper than the call stack', () => {
+    class TextReader extends BNGLParseTreeVisitor<string> {
+      protected defaultResult(): string {
+        return '';
+      }
+
+      read(tree: ParseTree): string {
+        return this.textOf(tree);
+      }
+    }
+    let tree: ParserRuleContext = parseExpression('k1');
+    for (let i = 0; i < 100_000; i++) {
+      const wrapper = new ParserRuleContext();
+      wrapper.addChild(tree);
+      tree = wrapper;
+    }
+
+    expect(new TextReader().read(tree)).toBe('k1');
+  });
+});
@@ -0,0 +1,58 @@
+import { describe, it, expect, beforeEach, afterEach } from 'vitest';
+import { withParser, setMemoizedRules } from '../../packages/engine/src/parser/SharedParser';
+import { BNGLVisitor } from '../../packages/engine/src/parser/BNGLVisitor';
+import { parseBNGLWithANTLR, clearParseTreeCache } from '../../packages/engine/src/parser/BNGLParserWrapper';
+
+const MODEL = `begin model
+begin parameters
+  k1 1.0
+end parameters
+begin molecule types
+  A(b)
+end molecule types
+begin seed species
+  A(b) 100
+end seed species
+end model
+`;
+
+describe('parseBNGLWithANTLR parse-tree cache', () => {
+  beforeEach(() => {
+    clearParseTreeCache();
+    setMemoizedRules(['prog', 'expression']);
+  });
+  afterEach(() => setMemoizedRules(['expression']));
+
+  it('builds an independent model for each call on the same source', () => {
+    const first = parseBNGLWithANTLR(MODEL);
+    const second = parseBNGLWithANTLR(MODEL);
+
+    expect(first.success).toBe(true);
+    expect(second.success).toBe(true);
+    expect(second.model).toEqual(first.model);
+    expect(second.model).not.toBe(first.model);
+    expect(second.model!.species).not.toBe(first.model!.species);
+  });
+
+  it('reports syntax errors again on a cache hit', () => {
+    const broken = MODEL.replace('A(b) 100', 'A(b)) 100');
+    const first = parseBNGLWithANTLR(broken);
+    const second = parseBNGLWithANTLR(broken);
+
+    expect(first.success).toBe(false);
+    expect(second.errors).toEqual(first.errors);
+  });
+});
+
+describe('BNGLVisitor releaseBlocks', () => {
+  it('drops each block subtree after visiting it', () => {
+    const tree = withParser(MODEL, undefined, (parser) => parser.prog());
+    const blocks = tree.program_block();
+
+    const model = new BNGLVisitor({ releaseBlocks: true }).visit(tree);
+
+    expect(Object.keys(model.parameters)).toEqual(['k1']);
+    expect(model.species).toHaveLength(1);
+    expect(blocks.every((block) => block.children === undefined)).toBe(true);
+  });
+});
@@ -0,0 +1,241 @@
+import { describe, it, expect } from 'vitest';
+import { CharStreams, CommonTokenStream } from 'antlr4ts';
+import { ParseTreeWalker } from 'antlr4ts/tree/ParseTreeWalker';
+import { BNGLexer } from '../../packages/engine/src/parser/generated/BNGLexer';
+import { BNGParser, type Parameter_defContext, type Molecule_type_defContext } from '../../packages/engine/src/parser/generated/BNGParser';
+import type { BNGParserListener } from '../../packages/engine/src/parser/generated/BNGParserListener';
+import type { ParseTreeListener } from 'antlr4ts/tree/ParseTreeListener';
+import type { RuleNode } from 'antlr4ts/tree/RuleNode';
+import {
+  BNGLTreeWalker,
+  walkParseTree,
+  walkMany,
+  defineListener,
+  RuleDispatchListener,
+  PhasedRuleListener,
+  RulePhase,
+} from '../../packages/engine/src/parser/BNGLTreeWalker';
+
+const MODEL = `begin model
+begin parameters
+  k1 1.0
+  k2 2*k1
+end parameters
+begin molecule types
+  A(b,s~u~p)
+end molecule types
+end model
+`;
+
+function parseProg(src: string) {
+  const lexer = new BNGLexer(CharStreams.fromString(src));
+  const parser = new BNGParser(new CommonTokenStream(lexer));
+  parser.removeErrorListeners();
+  return parser.prog();
+}
+
+describe('BNGLTreeWalker', () => {
+  it('fires per-rule enter/exit hooks', () => {
+    const entered: string[] = [];
+    let exitedProg = 0;
+    const listener: BNGParserListener = {
+      enterParameter_def: (ctx) => { entered.push(ctx.param_name(0).text); },
+      exitProg: () => { exitedProg++; },
+    };
+
+    walkParseTree(listener, parseProg(MODEL));
+
+    expect(entered).toEqual(['k1', 'k2']);
+    expect(exitedProg).toBe(1);
+  });
+
+  it('keeps enterEveryRule/exitEveryRule semantics', () => {
+    let enters = 0;
+    let exits = 0;
+    const listener: BNGParserListener = {
+      enterEveryRule: () => { enters++; },
+      exitEveryRule: () => { exits++; },
+    };
+
+    walkParseTree(listener, parseProg(MODEL));
+
+    expect(enters).toBeGreaterThan(0);
+    expect(exits).toBe(enters);
+  });
+
+  it('visits rules and tokens in the same order as the stock walker', () => {
+    const record = (trace: string[]): BNGParserListener => ({
+      enterEveryRule: (ctx) => { trace.push(`>${ctx.ruleIndex}`); },
+      exitEveryRule: (ctx) => { trace.push(`<${ctx.ruleIndex}`); },
+      visitTerminal: (node) => { trace.push(node.text); },
+    });
+    const tree = parseProg(MODEL);
+    const expected: string[] = [];
+    const actual: string[] = [];
+
+    ParseTreeWalker.DEFAULT.walk(record(expected), tree);
+    walkParseTree(record(actual), tree);
+
+    expect(actual).toEqual(expected);
+  });
+
+  it('binds class-based hooks to the listener instance', () => {
+    class MoleculeCounter implements BNGParserListener {
+      count = 0;
+      enterMolecule_type_def(): void {
+        this.count++;
+      }
+    }
+    const counter = new MoleculeCounter();
+
+    walkParseTree(counter, parseProg(MODEL));
+
+    expect(counter.count).toBe(1);
+  });
+
+  it('resolves hooks per class and per instance-defined hook', () => {
+    class ParamCounter implements BNGParserListener {
+      count = 0;
+      enterParameter_def(): void {
+        this.count++;
+      }
+    }
+    class FieldHookCounter extends ParamCounter {
+      molecules = 0;
+      enterMolecule_type_def = (): void => {
+        this.molecules++;
+      };
+    }
+    const tree = parseProg(MODEL);
+    const first = new ParamCounter();
+    const second = new ParamCounter();
+    const withField = new FieldHookCounter();
+
+    walkParseTree(first, tree);
+    walkParseTree(second, tree);
+    walkParseTree(withField, tree);
+
+    expect([first.count, second.count, withField.count]).toEqual([2, 2, 2]);
+    expect(withField.molecules).toBe(1);
+  });
+
+  it('still calls overridden enterRule for every rule', () => {
+    const tree = parseProg(MODEL);
+    let everyRule = 0;
+    walkParseTree({ enterEveryRule: () => { everyRule++; } }, tree);
+
+    class CountingWalker extends BNGLTreeWalker {
+      entered = 0;
+      protected enterRule(listener: ParseTreeListener, r: RuleNode): void {
+        this.entered++;
+        super.enterRule(listener, r);
+      }
+    }
+    const walker = new CountingWalker();
+    walker.walk({}, tree);
+
+    expect(walker.entered).toBe(everyRule);
+  });
+
+  it('rejects walking a listener that is already in a walk', () => {
+    const tree = parseProg(MODEL);
+    const listener: BNGParserListener = {
+      enterProg: () => walkParseTree(listener, tree),
+    };
+    expect(() => walkParseTree(listener, tree)).toThrow(/already in a walk/);
+    // The guard is released after the failed walk.
+    expect(() => walkParseTree({}, tree)).not.toThrow();
+  });
+});
+
+describe('walkMany', () => {
+  it('walks each tree with its own listener', () => {
+    class ParamNames implements BNGParserListener {
+      names: string[] = [];
+      enterParameter_def(ctx: Parameter_defContext): void {
+        this.names.push(ctx.param_name(0).text);
+      }
+    }
+    const trees = [parseProg(MODEL), parseProg(MODEL.replace('k2 2*k1', 'k3 3'))];
+
+    const listeners = walkMany(() => new ParamNames(), trees);
+
+    expect(listeners.map((l) => l.names)).toEqual([['k1', 'k2'], ['k1', 'k3']]);
+    expect(listeners[0]).not.toBe(listeners[1]);
+  });
+});
+
+describe('defineListener', () => {
+  it('keeps only function-valued hooks and dispatches them', () => {
+    const names: string[] = [];
+    const listener = defineListener({
+      enterParameter_def: (ctx) => { names.push(ctx.param_name(0).text); },
+      exitProg: undefined,
+    });
+
+    walkParseTree(listener, parseProg(MODEL));
+
+    expect(names).toEqual(['k1', 'k2']);
+    expect(Object.keys(listener)).toEqual(['enterParameter_def']);
+    expect(Object.isFrozen(listener)).toBe(true);
+  });
+});
+
+describe('RuleDispatchListener', () => {
+  class ParameterNames extends RuleDispatchListener {
+    names: string[] = [];
+    exits = 0;
+
+    constructor() {
+      super();
+      this.onEnter<Parameter_defContext>(BNGParser.RULE_parameter_def, (ctx) => {
+        this.names.push(ctx.param_name(0).text);
+      });
+      this.onExit(BNGParser.RULE_parameters_block, this.countExit);
+    }
+
+    private countExit(): void {
+      this.exits++;
+    }
+  }
+
+  it('dispatches registered handlers under the stock ANTLR walker', () => {
+    const listener = new ParameterNames();
+    ParseTreeWalker.DEFAULT.walk(listener, parseProg(MODEL));
+    expect(listener.names).toEqual(['k1', 'k2']);
+    expect(listener.exits).toBe(1);
+  });
+
+  it('dispatches registered handlers under BNGLTreeWalker', () => {
+    const listener = new ParameterNames();
+    walkParseTree(listener, parseProg(MODEL));
+    expect(listener.names).toEqual(['k1', 'k2']);
+    expect(listener.exits).toBe(1);
+  });
+});
+
+describe('PhasedRuleListener', () => {
+  class PhaseTrace extends PhasedRuleListener {
+    trace: string[] = [];
+
+    constructor() {
+      super();
+      this.onRule(BNGParser.RULE_parameters_block, (_ctx, phase: RulePhase) => {
+        this.trace.push(phase === RulePhase.ENTER ? 'params>' : '<params');
+      });
+      this.onRule<Parameter_defContext>(BNGParser.RULE_parameter_def, (ctx) => {
+        this.trace.push(ctx.param_name(0).text);
+      }, RulePhase.EXIT);
+      this.onRule<Molecule_type_defContext>(BNGParser.RULE_molecule_type_def, (_ctx, phase) => {
+        this.trace.push(`molecule:${phase}`);
+      }, RulePhase.ENTER);
+    }
+  }
+
+  it('calls one handler per rule with the phase, skipping unregistered phases', () => {
+    const listener = new PhaseTrace();
+    walkParseTree(listener, parseProg(MODEL));
+    expect(listener.trace).toEqual(['params>', 'k1', 'k2', '<params', `molecule:${RulePhase.ENTER}`]);
+    expect(RulePhase.EXIT).not.toBe(RulePhase.ENTER);
+  });
+});
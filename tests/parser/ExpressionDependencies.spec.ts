@@ -0,0 +1,43 @@
+import { describe, it, expect } from 'vitest';
+import { CharStreams, CommonTokenStream } from 'antlr4ts';
+import { BNGLexer } from '../../packages/engine/src/parser/generated/BNGLexer';
+import { BNGParser } from '../../packages/engine/src/parser/generated/BNGParser';
+import {
+  DependencyVisitor,
+  getExpressionDependencies,
+  clearExpressionDependencyCache,
+} from '../../packages/engine/src/parser/ExpressionDependencies';
+
+function visitorDependencies(expression: string): string[] {
+  const parser = new BNGParser(new CommonTokenStream(new BNGLexer(CharStreams.fromString(expression))));
+  parser.removeErrorListeners();
+  const visitor = new DependencyVisitor();
+  visitor.visit(parser.expression());
+  return [...visitor.dependencies];
+}
+
+describe('getExpressionDependencies', () => {
+  it('collects parameters, observables and functions but not built-ins', () => {
+    expect([...getExpressionDependencies('kf*Atot/(1 + exp(-Obs(S)/Km)) + t_end')])
+      .toEqual(['kf', 'Atot', 'Obs', 'S', 'Km', 't_end']);
+  });
+
+  it('matches DependencyVisitor on nested calls', () => {
+    const expression = 'if(A > 0, f(B, g(C)), max(D, time()))^2';
+    expect([...getExpressionDependencies(expression)]).toEqual(visitorDependencies(expression));
+  });
+
+  it('memoizes by expression text and hands out independent sets', () => {
+    clearExpressionDependencyCache();
+    const first = getExpressionDependencies('kf*Obs()');
+    first.add('mutated');
+    const second = getExpressionDependencies('kf*Obs()');
+
+    expect([...second]).toEqual(['kf', 'Obs']);
+    expect(second).not.toBe(first);
+  });
+
+  it('returns an empty set for blank input', () => {
+    expect(getExpressionDependencies('  ').size).toBe(0);
+  });
+});
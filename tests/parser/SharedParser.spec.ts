@@ -0,0 +1,210 @@
+import { describe, it, expect, afterEach } from 'vitest';
+import { CharStreams, CommonTokenStream, ParserRuleContext } from 'antlr4ts';
+import { BNGLexer } from '../../packages/engine/src/parser/generated/BNGLexer';
+import { BNGParser } from '../../packages/engine/src/parser/generated/BNGParser';
+import {
+  withParser,
+  getDFACacheSize,
+  clearDFACache,
+  setDFATrimThreshold,
+  setMemoizedRules,
+  isRuleMemoized,
+  parseStreaming,
+  visitStreaming,
+  clearInternedNames,
+} from '../../packages/engine/src/parser/SharedParser';
+import { BNGLParseTreeVisitor } from '../../packages/engine/src/parser/BNGLParseTreeVisitor';
+import type { Arg_nameContext, Parameter_defContext } from '../../packages/engine/src/parser/generated/BNGParser';
+import type { BNGParserListener } from '../../packages/engine/src/parser/generated/BNGParserListener';
+import type { ParseError } from '../../packages/engine/src/parser/BNGLParserWrapper';
+
+const MODEL = `begin model
+begin parameters
+  k1 1.0
+end parameters
+begin molecule types
+  A(b)
+end molecule types
+begin seed species
+  A(b) 100
+end seed species
+end model
+`;
+
+describe('withParser', () => {
+  it('collects syntax errors into the supplied array', () => {
+    const errors: ParseError[] = [];
+    withParser('k1 +* )', errors, (parser) => parser.expression());
+    expect(errors.length).toBeGreaterThan(0);
+
+    const clean: ParseError[] = [];
+    const text = withParser('2*k1 + 3', clean, (parser) => parser.expression().text);
+    expect(clean).toEqual([]);
+    expect(text).toBe('2*k1+3');
+  });
+
+  it('reports the same syntax errors as a plain LL parse, once each', () => {
+    const input = '(k1 + * 2) & k2 ^';
+    const expected: ParseError[] = [];
+    const lexer = new BNGLexer(CharStreams.fromString(input));
+    const parser = new BNGParser(new CommonTokenStream(lexer));
+    const collect = {
+      syntaxError: (_r: unknown, _s: unknown, line: number, column: number, message: string) => {
+        expected.push({ line, column, message });
+      },
+    };
+    lexer.removeErrorListeners();
+    lexer.addErrorListener(collect);
+    parser.removeErrorListeners();
+    parser.addErrorListener(collect);
+    const expectedText = parser.expression().text;
+
+    const errors: ParseError[] = [];
+    const text = withParser(input, errors, (p) => p.expression().text);
+
+    expect(expected.length).toBeGreaterThan(0);
+    expect(errors).toEqual(expected);
+    expect(text).toBe(expectedText);
+  });
+
+  it('keeps identifier text on the tokens it creates', () => {
+    clearInternedNames();
+    const tokens = withParser('kf*A + kf', undefined, (parser) => {
+      parser.expression();
+      return (parser.inputStream as CommonTokenStream).getTokens();
+    });
+
+    const names = tokens.filter((token) => token.type === BNGLexer.STRING);
+    expect(names.map((token) => token.text)).toEqual(['kf', 'A', 'kf']);
+  });
+
+  it('gives nested calls their own parser', () => {
+    const outer = withParser('a + b', undefined, (parser) => {
+      const inner = withParser('c * d', undefined, (innerParser) => {
+        expect(innerParser).not.toBe(parser);
+        return innerParser.expression().text;
+      });
+      return `${parser.expression().text}|${inner}`;
+    });
+    expect(outer).toBe('a+b|c*d');
+  });
+});
+
+describe('parseStreaming', () => {
+  it('fires rule hooks during the parse without building a tree', () => {
+    const names: string[] = [];
+    const trace: string[] = [];
+    let parent: unknown;
+    const listener: BNGParserListener = {
+      exitParam_name: (ctx) => { names.push(ctx.text); },
+      enterMolecule_type_def: (ctx) => { trace.push(`enter:${ctx.start.text}`); },
+      exitMolecule_type_def: (ctx) => {
+        trace.push('exit');
+        parent = ctx.parent;
+        expect(ctx.tryGetRuleContext(0, ParserRuleContext)).toBeUndefined();
+      },
+    };
+
+    parseStreaming(MODEL, listener);
+
+    expect(names).toEqual(['k1']);
+    expect(trace).toEqual(['enter:A', 'exit']);
+    expect(parent).toBeDefined();
+  });
+
+  it('parses from the given entry rule and reports syntax errors', () => {
+    const names: string[] = [];
+    const errors: ParseError[] = [];
+    parseStreaming('k1 * (k2 +', { exitArg_name: (ctx) => { names.push(ctx.text); } }, (p) => p.expression(), errors);
+
+    expect(names).toEqual(['k1', 'k2']);
+    expect(errors.length).toBeGreaterThan(0);
+  });
+});
+
+describe('visitStreaming', () => {
+  class ParamVisitor extends BNGLParseTreeVisitor<void> {
+    trace: string[] = [];
+
+    protected defaultResult(): void {}
+
+    visitArg_name(ctx: Arg_nameContext): void {
+      this.trace.push(ctx.text);
+    }
+
+    visitParameter_def(ctx: Parameter_defContext): void {
+      this.trace.push(`param:${ctx.start.text}`);
+    }
+  }
+
+  it('runs visit handlers on rule exit without building a tree', () => {
+    const visitor = visitStreaming('begin parameters\n  k1 1\n  k2 2*k1\nend parameters\n', new ParamVisitor());
+    expect(visitor.trace).toEqual(['param:k1', 'k1', 'param:k2']);
+  });
+
+  it('keeps child contexts when attached with buildParseTree', () => {
+    const visitor = new ParamVisitor();
+    const tree = withParser('k1 + k2', undefined, (parser) => {
+      visitor.attach(parser, { buildParseTree: true });
+      return parser.expression();
+    }, { twoStage: false });
+    expect(visitor.trace).toEqual(['k1', 'k2']);
+    expect(tree.childCount).toBe(1);
+  });
+});
+
+describe('DFA cache trimming', () => {
+  it('clears the shared DFA on demand and refills it on the next parse', () => {
+    withParser('k1*2 + exp(k2)', undefined, (parser) => parser.expression());
+    expect(getDFACacheSize()).toBeGreaterThan(0);
+
+    clearDFACache();
+    expect(getDFACacheSize()).toBe(0);
+
+    const text = withParser('k1*2 + exp(k2)', undefined, (parser) => parser.expression().text);
+    expect(text).toBe('k1*2+exp(k2)');
+    expect(getDFACacheSize()).toBeGreaterThan(0);
+  });
+
+  it('leaves the DFA alone while a parse is in progress', () => {
+    withParser('k1*2 + exp(k2)', undefined, (parser) => parser.expression());
+    const cleared = withParser('k1 + k2', undefined, (parser) => {
+      parser.expression();
+      return clearDFACache();
+    });
+
+    expect(cleared).toBe(false);
+    expect(getDFACacheSize()).toBeGreaterThan(0);
+    expect(clearDFACache()).toBe(true);
+  });
+
+  it('trims automatically once the threshold is exceeded', () => {
+    setDFATrimThreshold(1);
+    try {
+      withParser('k1*2 + exp(k2)', undefined, (parser) => parser.expression());
+      expect(getDFACacheSize()).toBe(0);
+    } finally {
+      setDFATrimThreshold();
+    }
+  });
+
+  it('rejects non-positive thresholds', () => {
+    expect(() => setDFATrimThreshold(0)).toThrow();
+  });
+});
+
+describe('setMemoizedRules', () => {
+  afterEach(() => setMemoizedRules(['expression']));
+
+  it('memoizes expressions but not whole programs by default', () => {
+    expect(isRuleMemoized('expression')).toBe(true);
+    expect(isRuleMemoized('prog')).toBe(false);
+  });
+
+  it('switches rules on and off and rejects unknown ones', () => {
+    setMemoizedRules(['prog']);
+    expect(isRuleMemoized('prog')).toBe(true);
+    expect(isRuleMemoized('expression')).toBe(false);
+    expect(() => setMemoizedRules(['additive_expr' as never])).toThrow(/Invalid memoized rule/);
+  });
+});
@@ -0,0 +1,75 @@
+import { describe, it, expect } from 'vitest';
+import { ExpressionBatch } from '@bngplayground/engine';
+import { withParser } from '../../packages/engine/src/parser/SharedParser';
+
+const slots = new Map([
+  ['kf', 0],
+  ['Km', 1],
+  ['Atot', 2],
+  ['Obs', 3],
+]);
+const values = Float64Array.from([2, 0.5, 10, 3]);
+
+describe('ExpressionBatch', () => {
+  it('evaluates every expression in one sweep', () => {
+    const batch = ExpressionBatch.compile(
+      [
+        'kf*Atot/(Km + Obs())',
+        '-kf^2^2 + 10 % 4',
+        'if(Obs > 2 && !(Km == 1), max(kf, Atot, 4), 0)',
+        'exp(ln(Atot)) + rint(2.5) + _pi',
+        'min(Km, kf) - 3',
+      ],
+      slots
+    );
+
+    expect(batch.size).toBe(5);
+    const out = batch.evaluateAll(values);
+    expect(out[0]).toBeCloseTo((2 * 10) / 3.5, 12);
+    // Unary minus binds tighter than ^, and ^ is left-associative.
+    expect(out[1]).toBe(16 + 2);
+    expect(out[2]).toBe(10);
+    expect(out[3]).toBeCloseTo(10 + 2 + Math.PI, 12);
+    expect(out[4]).toBe(-2.5);
+  });
+
+  it('reuses the output buffer and tracks new values', () => {
+    const batch = ExpressionBatch.compile(['kf*Km', 'kf+Km'], slots);
+    const out = new Float64Array(2);
+
+    batch.evaluateAll(values, out);
+    expect(Array.from(out)).toEqual([1, 2.5]);
+
+    expect(batch.evaluateAll([4, 4, 0, 0], out)).toBe(out);
+    expect(Array.from(out)).toEqual([16, 8]);
+  });
+
+  it('shares one constant pool across expressions', () => {
+    const batch = ExpressionBatch.compile(['2*kf', 'kf/2', '2'], slots);
+    expect(Array.from(batch.constants)).toEqual([2]);
+  });
+
+  it('compiles already-parsed expression trees', () => {
+    const trees = ['kf*Km', 'Atot - Obs'].map((text) => withParser(text, undefined, (parser) => parser.expression()));
+    const batch = ExpressionBatch.fromTrees(trees, slots);
+
+    expect(Array.from(batch.evaluateAll(values))).toEqual([1, 7]);
+    expect(() => ExpressionBatch.fromTrees([trees[0]], new Map())).toThrow(/Cannot compile 'kf\*Km'/);
+  });
+
+  it('evaluates log() as the natural log and reads time() from its slot', () => {
+    const timed = new Map([...slots, ['time', 4]]);
+    const batch = ExpressionBatch.compile(['log(Atot)', 'kf*time()'], timed);
+
+    const out = batch.evaluateAll([...values, 1.5]);
+    expect(out[0]).toBeCloseTo(Math.log(10), 12);
+    expect(out[1]).toBe(3);
+    expect(() => ExpressionBatch.compile(['time()'], slots)).toThrow(/Unknown identifier: time/);
+  });
+
+  it('rejects unknown names, unsupported calls and trailing input', () => {
+    expect(() => ExpressionBatch.compile(['kf*kr'], slots)).toThrow(/Unknown identifier: kr/);
+    expect(() => ExpressionBatch.compile(['f(kf)'], slots)).toThrow(/Unsupported call/);
+    expect(() => ExpressionBatch.compile(['kf Km'], slots)).toThrow(/Cannot compile 'kf Km'/);
+  });
+});
@@ -0,0 +1,76 @@
+import { describe, it, expect } from 'vitest';
+import {
+  MoleculePatternBatch,
+  NO_STATE,
+  STATE_ANY,
+  BOND_FREE,
+  BOND_BOUND,
+  BOND_EITHER,
+  NO_COMPARTMENT,
+  NO_TAG,
+  NO_WILDCARD,
+} from '@bngplayground/engine';
+
+describe('MoleculePatternBatch', () => {
+  it('lays out molecules, components and bonds in CSR columns', () => {
+    const batch = MoleculePatternBatch.fromPatterns(['A(b!1,s~p).B(a!1)', 'C()', 'A(b!+,s~?,t.,u!?)']);
+    const name = (id: number) => batch.name(id);
+
+    expect(batch.patternCount).toBe(3);
+    expect(batch.moleculeCount).toBe(4);
+    expect(Array.from(batch.patternOffsets)).toEqual([0, 2, 3, 4]);
+    expect(Array.from(batch.moleculeNames, name)).toEqual(['A', 'B', 'C', 'A']);
+    expect(Array.from(batch.componentOffsets)).toEqual([0, 2, 3, 3, 7]);
+    expect(Array.from(batch.componentNames, name)).toEqual(['b', 's', 'a', 'b', 's', 't', 'u']);
+
+    const states = Array.from(batch.componentStates);
+    expect(states[0]).toBe(NO_STATE);
+    expect(batch.name(states[1])).toBe('p');
+    expect(states[4]).toBe(STATE_ANY);
+    expect(batch.nameId('?')).toBe(-1);
+
+    const label = batch.nameId('1');
+    expect(Array.from(batch.bondOffsets)).toEqual([0, 1, 1, 2, 3, 3, 4, 5]);
+    expect(Array.from(batch.bonds)).toEqual([label, label, BOND_BOUND, BOND_FREE, BOND_EITHER]);
+  });
+
+  it('keeps molecule compartments, tags and bond wildcards', () => {
+    const batch = MoleculePatternBatch.fromPatterns(['A()', 'A()!+', 'A()!?%1', '@EC:L(r)@PM.R(l)', 'B%x']);
+    const name = (id: number) => (id < 0 ? id : batch.name(id));
+
+    expect(Array.from(batch.moleculeWildcards)).toEqual([NO_WILDCARD, BOND_BOUND, BOND_EITHER, NO_WILDCARD, NO_WILDCARD, NO_WILDCARD]);
+    expect(Array.from(batch.moleculeTags, name)).toEqual([NO_TAG, NO_TAG, '1', NO_TAG, NO_TAG, 'x']);
+    expect(Array.from(batch.speciesCompartments, name)).toEqual([
+      NO_COMPARTMENT, NO_COMPARTMENT, NO_COMPARTMENT, 'EC', 'EC', NO_COMPARTMENT,
+    ]);
+    expect(Array.from(batch.moleculeCompartments, name)).toEqual([
+      NO_COMPARTMENT, NO_COMPARTMENT, NO_COMPARTMENT, 'PM', NO_COMPARTMENT, NO_COMPARTMENT,
+    ]);
+  });
+
+  it('rejects molecule attributes, which have no column', () => {
+    expect(() => MoleculePatternBatch.fromPatterns(['A()[x=>1]'])).toThrow(/Molecule attributes are not supported/);
+  });
+
+  it('finds molecules by name and maps them back to patterns', () => {
+    const batch = MoleculePatternBatch.fromPatterns(['A(b)', 'B(a).A(b)', 'C()']);
+
+    expect(Array.from(batch.moleculesNamed('A'))).toEqual([0, 2]);
+    expect(batch.moleculesNamed('Nope')).toHaveLength(0);
+    expect([0, 1, 2, 3].map((m) => batch.patternOfMolecule(m))).toEqual([0, 1, 1, 2]);
+  });
+
+  it('keeps a separate name pool per batch', () => {
+    const first = MoleculePatternBatch.fromPatterns(['A(x)']);
+    const second = MoleculePatternBatch.fromPatterns(['B(y)']);
+
+    expect(first.names).toEqual(['A', 'x']);
+    expect(second.names).toEqual(['B', 'y']);
+    expect(first.nameId('B')).toBe(-1);
+  });
+
+  it('reports parse errors and trailing input', () => {
+    expect(() => MoleculePatternBatch.fromPatterns(['A(b!'])).toThrow(/Cannot parse 'A\(b!'/);
+    expect(() => MoleculePatternBatch.fromPatterns(['A(b) B(c)'])).toThrow(/Cannot parse 'A\(b\) B\(c\)': trailing input/);
+  });
+});
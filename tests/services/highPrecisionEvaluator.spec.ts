@@ -0,0 +1,26 @@
+import { describe, it, expect } from 'vitest';
+import { evaluateExpressionHighPrecision } from '../../packages/engine/src/services/graph/core/highPrecisionEvaluator';
+
+describe('evaluateExpressionHighPrecision', () => {
+  it('evaluates through the single-child wrapper rules', () => {
+    const params = new Map([['kf', 2], ['Km', 0.5]]);
+    expect(evaluateExpressionHighPrecision('kf*(1 + Km) - 3', params)).toBe(0);
+    expect(evaluateExpressionHighPrecision('(kf >= 2) && (Km < 1)', params)).toBe(1);
+  });
+
+  it('folds operator chains left to right', () => {
+    expect(evaluateExpressionHighPrecision('2^3^2', {})).toBe(64);
+    expect(evaluateExpressionHighPrecision('12 / 3 * 2 % 5 - 1 + 4', {})).toBe(6);
+    expect(evaluateExpressionHighPrecision('1 < 2 == 1 || 0', {})).toBe(1);
+  });
+
+  it('keeps precision across widely separated magnitudes', () => {
+    const params = new Map([['big', 1e20], ['small', 1]]);
+    expect(evaluateExpressionHighPrecision('(big + small) - big', params)).toBe(1);
+  });
+
+  it('calls custom functions with mapped arguments', () => {
+    const functions = new Map([['sq', { args: ['x'], expr: 'x*x' }]]);
+    expect(evaluateExpressionHighPrecision('sq(3) + 1', {}, functions)).toBe(10);
+  });
+});
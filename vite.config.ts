@@ -41,17 +41,23 @@ export default defineConfig(() => {
         'd3',
         'antlr4ts',
         'antlr4ts/tree/AbstractParseTreeVisitor',
+        'antlr4ts/tree/ParseTreeWalker',
+        'antlr4ts/tree/TerminalNode',
+        'antlr4ts/tree/ErrorNode',
         'antlr4ts/atn/ATNDeserializer',
         'antlr4ts/Lexer',
         'antlr4ts/atn/LexerATNSimulator',
         'antlr4ts/VocabularyImpl',
         'antlr4ts/misc/Utils',
+        'antlr4ts/misc/Interval',
         'antlr4ts/atn/ATN',
         'antlr4ts/FailedPredicateException',
         'antlr4ts/NoViableAltException',
         'antlr4ts/Parser',
         'antlr4ts/ParserRuleContext',
         'antlr4ts/atn/ParserATNSimulator',
+        'antlr4ts/atn/PredictionMode',
+        'antlr4ts/misc/ParseCancellationException',
         'antlr4ts/RecognitionException',
         'antlr4ts/Token',
         'jsep'